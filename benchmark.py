@@ -0,0 +1,308 @@
+#! /usr/bin/python
+"""Сравнение скорости разбора списков цепей KiCad.
+
+Использование:
+
+    python benchmark.py [параметры] [список_цепей.net список_цепей.xml ...]
+
+Каждый файл разбирается всеми способами (см. ниже). Результаты разбора
+сравниваются между собой, после чего для каждого способа выводится время
+разбора, наибольший объём памяти, выделенной при разборе, количество
+элементов списка цепей, разбираемых за секунду, и во сколько раз способ
+быстрее посимвольного разбора.
+
+Ускорение указывается относительно посимвольного разбора (legacy) в его
+нынешнем виде: он создаёт те же компактные элементы списка цепей и не
+использует рекурсию, поэтому уже быстрее первоначального посимвольного
+разбора (примерно в 1,5 раза на больших файлах). Относительно
+первоначального разбора ускорение соответственно больше.
+
+Способы разбора:
+
+    legacy    прежний посимвольный разбор;
+    fast      разбор по лексемам (*.net) или потоковым парсером expat (*.xml);
+    skip      разбор только разделов design и components: разделы libparts,
+              libraries и nets пропускаются без разбора (время в сравнении со
+              способом fast показывает выигрыш от пропуска разделов);
+    sections  разбор только раздела design и записей о компонентах (как при
+              построении документа);
+    process   разбор в отдельном процессе интерпретатором Python,
+              установленным в системе (память учитывается только для
+              текущего процесса).
+
+Перед сравнением скорости проверяется, что мнемоники XML (&amp;, &lt;,
+&#1046; и т.п.) в значениях полей компонентов раскрываются всеми способами
+разбора одинаково и сохраняются при записи списка цепей в файл.
+
+Параметры:
+
+    -g N  создать (во временном каталоге) и разобрать списки цепей *.net и
+          *.xml с N компонентами (см. netgen.py); можно указать несколько
+          раз. Если не указаны ни файлы, ни этот параметр -- создаются
+          списки цепей с 1000 и 10000 компонентов;
+    -b    способы разбора через запятую (по умолчанию -- все);
+    -r N  количество повторов разбора, учитывается лучшее время (по
+          умолчанию 3).
+
+"""
+
+import getopt
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(
+    0,
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "index", "Scripts", "python", "pythonpath")
+)
+import kicadnet
+import netgen
+
+# Количество повторов разбора по умолчанию; учитывается лучшее время.
+REPEATS = 3
+
+# Способы разбора: имя и параметры конструктора списка цепей.
+BACKENDS = (
+    ("legacy", {"legacy": True}),
+    ("fast", {}),
+    ("skip", {"sections": ("design", "components")}),
+    ("sections", {"sections": ("design",), "components": True}),
+    ("process", {"interpreter": kicadnet.findInterpreter()}),
+)
+
+# Количество компонентов в создаваемых списках цепей по умолчанию.
+GENERATED_SIZES = (1000, 10000)
+
+# Список цепей XML с мнемониками в значениях компонента и ожидаемые значения
+# (значение, описание, поля) после раскрытия мнемоник.
+ENTITIES_NETLIST = """<?xml version="1.0" encoding="UTF-8"?>
+<export version="D">
+  <design>
+    <source>entities.sch</source>
+  </design>
+  <components>
+    <comp ref="R1">
+      <value>10k &amp; 1%</value>
+      <fields>
+        <field name="Тип &quot;А&quot;">R&amp;D &lt;1&gt; &#1046;&#x416;</field>
+        <field name="Примечание">&apos;a&apos; &quot;b&quot; &gt;</field>
+      </fields>
+      <libsource lib="Device" part="R" description="a &lt; b &amp; c"/>
+    </comp>
+  </components>
+</export>
+"""
+ENTITIES_EXPECTED = (
+    "10k & 1%",
+    "a < b & c",
+    {"Тип \"А\"": "R&D <1> ЖЖ", "Примечание": "'a' \"b\" >"}
+)
+
+
+def isSame(first, second):
+    """Сравнить два дерева элементов списка цепей."""
+    stack = [(first, second)]
+    while stack:
+        first, second = stack.pop()
+        if first is None or second is None:
+            if first is not second:
+                return False
+            continue
+        if first.name != second.name \
+            or first.text != second.text \
+            or first.attributes != second.attributes \
+            or len(first.items) != len(second.items):
+                return False
+        stack.extend(zip(first.items, second.items))
+    return True
+
+def selectSections(data, sections):
+    """Вернуть копию корневого элемента только с указанными разделами."""
+    if data is None:
+        return None
+    return kicadnet.NetlistItem(
+        None,
+        data.name,
+        data.attributes,
+        [item for item in data.items if item.name in sections],
+        data.text
+    )
+
+def getComponentValues(netlist):
+    """Вернуть значения, описания и поля компонентов списка цепей."""
+    if netlist.components is not None:
+        return [
+            (record.value, record.description, record.fields)
+            for record in netlist.components
+        ]
+    values = []
+    for section in netlist.data.items:
+        if section.name != "components":
+            continue
+        for comp in section.items:
+            value = None
+            description = None
+            fields = {}
+            for item in comp.items:
+                if item.name == "value":
+                    value = item.text
+                elif item.name == "libsource":
+                    description = item.attributes.get("description")
+                elif item.name == "fields":
+                    for field in item.items:
+                        fields[field.attributes["name"]] = field.text
+            values.append((value, description, fields))
+    return values
+
+def checkEntities(backends):
+    """Проверить раскрытие мнемоник XML в значениях полей компонентов.
+
+    Список цепей ENTITIES_NETLIST разбирается указанными способами, затем
+    записывается в файл и считывается повторно.
+
+    Возвращаемое значение (bool) -- True, если все значения совпадают с
+    ENTITIES_EXPECTED.
+
+    """
+    directory = tempfile.mkdtemp(prefix="kicadnet")
+    try:
+        fileName = os.path.join(directory, "entities.xml")
+        with open(fileName, "w", encoding="utf-8") as netlist:
+            netlist.write(ENTITIES_NETLIST)
+        savedName = os.path.join(directory, "saved.xml")
+        kicadnet.Netlist(fileName).save(savedName)
+        result = True
+        for name, kwargs in BACKENDS:
+            if name not in backends:
+                continue
+            if name == "process" and kwargs["interpreter"] is None:
+                continue
+            for checkedName in (fileName, savedName):
+                netlist = kicadnet.Netlist(checkedName, **kwargs)
+                values = getComponentValues(netlist)
+                if values != [ENTITIES_EXPECTED]:
+                    print("ОШИБКА: мнемоники XML раскрыты неверно ({}, {}): {}".format(
+                        name,
+                        os.path.basename(checkedName),
+                        values
+                    ))
+                    result = False
+        return result
+    finally:
+        shutil.rmtree(directory)
+
+def countItems(item):
+    """Вернуть количество элементов в дереве списка цепей."""
+    count = 0
+    stack = [item] if item is not None else []
+    while stack:
+        item = stack.pop()
+        count += 1
+        stack.extend(item.items)
+    return count
+
+def measure(fileName, repeats, **kwargs):
+    """Вернуть лучшее время разбора файла и результат разбора."""
+    bestTime = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        netlist = kicadnet.Netlist(fileName, **kwargs)
+        bestTime = min(bestTime, time.perf_counter() - start)
+    return bestTime, netlist
+
+def measurePeakMemory(fileName, **kwargs):
+    """Вернуть наибольший объём памяти (байт), выделенной при разборе файла."""
+    tracemalloc.start()
+    try:
+        kicadnet.Netlist(fileName, **kwargs)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def benchmark(fileName, backends, repeats):
+    """Разобрать файл указанными способами и вывести результаты.
+
+    Возвращаемое значение (bool) -- True, если результаты разбора всеми
+    способами совпадают.
+
+    """
+    reference = kicadnet.Netlist(fileName)
+    itemCount = countItems(reference.data)
+    print(fileName)
+    print("  размер файла: {:.1f} КиБ, элементов: {}".format(
+        os.path.getsize(fileName) / 1024,
+        itemCount
+    ))
+    print("  {:<10}{:>10}{:>12}{:>14}{:>11}".format(
+        "способ", "время, с", "память, МиБ", "элементов/с", "ускорение"
+    ))
+    legacyTime = None
+    result = True
+    for name, kwargs in BACKENDS:
+        if name not in backends:
+            continue
+        if name == "process" and kwargs["interpreter"] is None:
+            print("  {:<10}интерпретатор Python не найден".format(name))
+            continue
+        bestTime, netlist = measure(fileName, repeats, **kwargs)
+        peakMemory = measurePeakMemory(fileName, **kwargs)
+        if name == "legacy":
+            legacyTime = bestTime
+        print("  {:<10}{:>10.3f}{:>12.1f}{:>14.0f}{:>11}".format(
+            name,
+            bestTime,
+            peakMemory / (1 << 20),
+            itemCount / bestTime,
+            "{:.1f}".format(legacyTime / bestTime) if legacyTime is not None else "-"
+        ))
+        expected = reference.data
+        if "sections" in kwargs:
+            expected = selectSections(expected, kwargs["sections"])
+        if not isSame(expected, netlist.data):
+            print("  ОШИБКА: результаты разбора не совпадают!")
+            result = False
+    return result
+
+def main():
+    try:
+        options, fileNames = getopt.gnu_getopt(sys.argv[1:], "g:b:r:")
+    except getopt.GetoptError as error:
+        print(error)
+        print(__doc__)
+        return 1
+    sizes = []
+    backends = [name for name, _ in BACKENDS]
+    repeats = REPEATS
+    for option, value in options:
+        if option == "-g":
+            sizes.append(int(value))
+        elif option == "-b":
+            backends = value.split(",")
+        elif option == "-r":
+            repeats = int(value)
+    if not fileNames and not sizes:
+        sizes = GENERATED_SIZES
+    if not checkEntities(backends):
+        return 1
+    directory = None
+    if sizes:
+        directory = tempfile.mkdtemp(prefix="kicadnet")
+        for size in sizes:
+            baseName = os.path.join(directory, "netlist{}".format(size))
+            netgen.generateNetlist(baseName + ".net", components=size)
+            netgen.convertNetlist(baseName + ".net", baseName + ".xml")
+            fileNames.extend((baseName + ".net", baseName + ".xml"))
+    try:
+        for fileName in fileNames:
+            if not benchmark(fileName, backends, repeats):
+                return 1
+    finally:
+        if directory is not None:
+            shutil.rmtree(directory)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
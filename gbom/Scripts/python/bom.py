@@ -177,7 +177,7 @@ class BomBuildingThread(threading.Thread):
         def fillRow(values, isTitle=False, posIncrement=0):
             colWidth = (6, 83, 44, 69, 64, 9, 9, 9, 9, 9, 9, 9, 9, 9, 9, 23)
             extraRow = [""] * len(values)
-            extremeWidthFactor = config.getint("doc", "extreme width factor")
+            extremeWidthFactor = options.doc.extremeWidthFactor
             doc.lockControllers()
             for col in range(len(values)):
                 if values[col] == "" and not (col == 0 and posIncrement != 0):
@@ -219,7 +219,7 @@ class BomBuildingThread(threading.Thread):
                 # параметров абзаца!
                 cellCursor.CharScaleWidth = widthFactor
                 if col == 0 and posIncrement \
-                    and config.getboolean("doc", "only components have position numbers"):
+                    and options.doc.onlyComponentsHavePositionNumbers:
                         if "com.sun.star.text.fieldmaster.SetExpression.Позиция" in doc.TextFieldMasters:
                             posFieldMaster = doc.TextFieldMasters["com.sun.star.text.fieldmaster.SetExpression.Позиция"]
                         else:
@@ -252,7 +252,10 @@ class BomBuildingThread(threading.Thread):
         # Начало построения таблицы
         # ----------------------------------------------------------------
         try:
-            schematic = common.getSchematicData()
+            # Параметры считываются один раз и не меняются в процессе
+            # построения.
+            options = config.getSnapshot()
+            schematic = common.getSchematicData(options)
             if schematic is None:
                 return
             doc = XSCRIPTCONTEXT.getDocument()
@@ -262,7 +265,7 @@ class BomBuildingThread(threading.Thread):
             self.currentRow = table.Rows.Count - 1
             compGroups = schematic.getGroupedComponents()
             prevGroup = None
-            emptyRowsType = config.getint("doc", "empty rows between diff type")
+            emptyRowsType = options.doc.emptyRowsBetweenDiffType
 
             progressTotal = 6
             for group in compGroups:
@@ -284,10 +287,10 @@ class BomBuildingThread(threading.Thread):
                     doc.lockControllers()
                     gotoNextRow(emptyRowsType)
                     doc.unlockControllers()
-                    if config.getboolean("doc", "reserve position numbers"):
+                    if options.doc.reservePositionNumbers:
                         increment += emptyRowsType
                 if len(group) == 1 \
-                    and not config.getboolean("doc", "every group has title"):
+                    and not options.doc.everyGroupHasTitle:
                         compType = group[0].getBomValue("type", singular=True)
                         compName = group[0].getBomValue("name")
                         compCode = group[0].getBomValue("code")
@@ -311,9 +314,9 @@ class BomBuildingThread(threading.Thread):
                             ["", title],
                             isTitle=True
                         )
-                    if config.getboolean("doc", "empty row after group title"):
+                    if options.doc.emptyRowAfterGroupTitle:
                         gotoNextRow()
-                        if config.getboolean("doc", "reserve position numbers"):
+                        if options.doc.reservePositionNumbers:
                             increment += 1
                     for compRange in group:
                         compName = compRange.getBomValue("name")
@@ -334,7 +337,7 @@ class BomBuildingThread(threading.Thread):
 
             progressDialog.stepUp()
 
-            if config.getboolean("doc", "prohibit titles at bottom"):
+            if options.doc.prohibitTitlesAtBottom:
                 _, firstRowCount, otherRowCount = common.getFirstPageInfo()
                 pos = firstRowCount
                 while pos < table.Rows.Count:
@@ -362,7 +365,7 @@ class BomBuildingThread(threading.Thread):
 
             progressDialog.stepUp()
 
-            if config.getboolean("doc", "prohibit empty rows at top"):
+            if options.doc.prohibitEmptyRowsAtTop:
                 _, firstRowCount, otherRowCount = common.getFirstPageInfo()
                 pos = firstRowCount + 1
                 while pos < table.Rows.Count:
@@ -374,7 +377,7 @@ class BomBuildingThread(threading.Thread):
 
             progressDialog.stepUp()
 
-            if not config.getboolean("doc", "only components have position numbers"):
+            if not options.doc.onlyComponentsHavePositionNumbers:
                 doc.lockControllers()
                 if "com.sun.star.text.fieldmaster.SetExpression.Позиция" in doc.TextFieldMasters:
                     posFieldMaster = doc.TextFieldMasters["com.sun.star.text.fieldmaster.SetExpression.Позиция"]
@@ -406,7 +409,7 @@ class BomBuildingThread(threading.Thread):
 
             progressDialog.stepUp()
 
-            if config.getboolean("doc", "process repeated values"):
+            if options.doc.processRepeatedValues:
                 doc.lockControllers()
                 colCount = 16
                 prevValues = [""] * colCount
@@ -427,9 +430,9 @@ class BomBuildingThread(threading.Thread):
 
             progressDialog.stepUp()
 
-            if config.getboolean("doc", "append rev table"):
+            if options.doc.appendRevTable:
                 pageCount = doc.CurrentController.PageCount
-                if pageCount > config.getint("doc", "pages rev table"):
+                if pageCount > options.doc.pagesRevTable:
                     common.appendRevTable()
 
         except StopException:
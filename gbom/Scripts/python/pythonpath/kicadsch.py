@@ -0,0 +1,602 @@
+"""Чтение данных из файлов схем KiCad.
+
+Модуль позволяет получить сведения о компонентах и основную надпись
+непосредственно из файлов схемы KiCad 6 и новее (*.kicad_sch) и KiCad 5
+(*.sch), без предварительного экспорта списка цепей. Иерархическая схема
+читается целиком: вложенные листы находятся по ссылкам в файлах схем,
+каждый файл разбирается один раз (независимо от количества его
+экземпляров).
+
+"""
+
+import collections
+import os
+import re
+
+# Запись о компоненте схемы (аналогична записям, извлекаемым из списка
+# цепей): обозначение, значение, посадочное место, документация, описание
+# и словарь дополнительных полей ("имя поля": "значение").
+ComponentRecord = collections.namedtuple(
+    "ComponentRecord",
+    ("reference", "value", "footprint", "datasheet", "description", "fields")
+)
+
+# Лексемы S-выражений: открывающая скобка, закрывающая скобка, значение в
+# кавычках (без кавычек), значение без кавычек и непарная кавычка.
+_SCH_TOKENS = re.compile(
+    r'\s*(?:(\()|(\))|"((?:[^"\\]|\\.)*)"|([^\s()"]+)|("))',
+    re.DOTALL
+)
+
+# Экранированные символы в значениях.
+_SCH_ESCAPED = re.compile(r'\\(.)', re.DOTALL)
+_SCH_ESCAPES = {"n": "\n", "r": "\r", "t": "\t"}
+
+# Элементы заголовка файла схемы, предшествующие описаниям символов и листов.
+_SCH_HEADER = frozenset(
+    ("version", "generator", "generator_version", "uuid", "paper", "title_block")
+)
+
+# Обязательные поля символа, которые не относятся к дополнительным полям
+# компонента.
+_MANDATORY_FIELDS = frozenset(
+    ("Reference", "Value", "Footprint", "Datasheet", "Description")
+)
+
+# Строки файла схемы KiCad 5: основная надпись, поля и экземпляры компонента,
+# поля листа.
+_LEGACY_DESCR = re.compile(r'\$Descr (\S+)')
+_LEGACY_TITLE = re.compile(r'(Title|Date|Rev|Comp|Comment\d+) "((?:[^"\\]|\\.)*)"')
+_LEGACY_FIELD = re.compile(
+    r'F (\d+) "((?:[^"\\]|\\.)*)"(?:.*"((?:[^"\\]|\\.)*)")?'
+)
+_LEGACY_INSTANCE = re.compile(r'AR Path="([^"]*)" Ref="([^"]*)"')
+_LEGACY_SHEET_FIELD = re.compile(r'F([01]) "((?:[^"\\]|\\.)*)"')
+
+# Имена элементов основной надписи KiCad 5 (как в файлах KiCad 6).
+_LEGACY_TITLE_NAMES = {"Title": "title", "Date": "date", "Rev": "rev", "Comp": "company"}
+
+# Имена обязательных полей компонента KiCad 5 по номерам.
+_LEGACY_FIELD_NAMES = ("Reference", "Value", "Footprint", "Datasheet")
+
+# Имена свойств листа, содержащих имя листа и имя файла (KiCad 6 и KiCad 7).
+_SHEET_NAME_PROPERTIES = ("Sheetname", "Sheet name")
+_SHEET_FILE_PROPERTIES = ("Sheetfile", "Sheet file")
+
+
+class ParseException(Exception):
+    """Ошибка при разборе структуры файла схемы."""
+
+    def __init__(self, line, pos, message):
+        Exception.__init__(self)
+        self.line = line
+        self.pos = pos
+        self.message = message
+        self.value = "Строка {}, позиция {}:\n{}".format(
+            line,
+            pos,
+            message
+        )
+
+    def __str__(self):
+        return self.value
+
+
+def _unescape(match):
+    """Вернуть символ, соответствующий экранированному."""
+    character = match.group(1)
+    return _SCH_ESCAPES.get(character, character)
+
+def _error(content, index, message):
+    """Вызвать исключение ParseException для позиции index в содержимом."""
+    line = content.count("\n", 0, index) + 1
+    pos = index - (content.rfind("\n", 0, index) + 1) + 1
+    raise ParseException(line, pos, message)
+
+def parseExpression(content, header=None):
+    """Разобрать S-выражение.
+
+    Аргументы:
+    content (str) -- текст S-выражения;
+    header (frozenset of str) -- имена элементов заголовка: если указаны,
+        разбор прекращается на первом вложенном элементе верхнего уровня с
+        другим именем, и возвращается только заголовок (None -- разбирается
+        всё выражение).
+
+    Возвращаемое значение (list) -- элемент верхнего уровня в виде списка:
+        первое значение -- имя элемента, остальные -- значения (str) и
+        вложенные элементы (list). Значения в кавычках возвращаются без
+        кавычек и экранирования.
+
+    """
+    stack = []
+    current = []
+    for match in _SCH_TOKENS.finditer(content):
+        opening, closing, quoted, plain, unpaired = match.groups()
+        if opening:
+            item = []
+            current.append(item)
+            stack.append(current)
+            current = item
+        elif closing:
+            if not stack:
+                _error(content, match.start(2), "Обнаружена лишняя закрывающая скобка!")
+            current = stack.pop()
+        elif plain is not None:
+            if header is not None and len(stack) == 2 and not current \
+                and plain not in header:
+                    stack[1].pop()
+                    return stack[1]
+            current.append(plain)
+        elif quoted is not None:
+            if '\\' in quoted:
+                quoted = _SCH_ESCAPED.sub(_unescape, quoted)
+            current.append(quoted)
+        elif unpaired:
+            _error(
+                content,
+                match.start(5),
+                "Значение неожиданно закончилось (должно заканчиваться символом '\"')!"
+            )
+    if stack:
+        _error(content, len(content), "Не найдена закрывающая скобка!")
+    if len(current) != 1 or not isinstance(current[0], list):
+        _error(content, 0, "Файл должен содержать ровно один элемент верхнего уровня!")
+    return current[0]
+
+def _unquote(text):
+    """Удалить экранирование из значения в кавычках."""
+    if '\\' in text:
+        return _SCH_ESCAPED.sub(_unescape, text)
+    return text
+
+def readSheetFile(fileName, headerOnly=False):
+    """Считать файл схемы.
+
+    Аргументы:
+    fileName (str) -- полное имя файла схемы;
+    headerOnly (bool) -- считать только формат листа и основную надпись.
+
+    Возвращаемое значение -- SheetFile (для файлов *.kicad_sch) или
+    LegacySheetFile (для файлов *.sch).
+
+    """
+    if fileName.endswith(".sch"):
+        return LegacySheetFile(fileName, headerOnly)
+    return SheetFile(fileName, headerOnly)
+
+def _getValue(item, index=1):
+    """Вернуть значение элемента с указанным номером (или None)."""
+    if len(item) > index and isinstance(item[index], str):
+        return item[index]
+    return None
+
+
+class SheetFile():
+    """Содержимое файла схемы (одного листа иерархической схемы)."""
+
+    def __init__(self, fileName, headerOnly=False):
+        """Считать файл схемы.
+
+        Аргументы:
+        fileName (str) -- полное имя файла схемы (*.kicad_sch);
+        headerOnly (bool) -- считать только заголовок файла (идентификатор,
+            формат листа и основную надпись); остальное содержимое файла не
+            разбирается, и списки символов и листов остаются пустыми.
+
+        Атрибуты:
+        fileName (str) -- полное имя файла схемы;
+        uuid (str) -- уникальный идентификатор листа;
+        paper (str) -- формат листа, например: "A4";
+        titleBlock (dict of str) -- основная надпись: "title", "date",
+            "rev", "company", "comment 1", "comment 2" и т.д.;
+        libSymbols (dict) -- сведения о символах библиотеки: идентификатор
+            символа -> (описание, признак символа питания);
+        symbols (list of tuple) -- символы листа: (идентификатор символа,
+            идентификатор символа библиотеки, словарь свойств, словарь
+            обозначений экземпляров по путям листов (KiCad 7 и новее));
+        sheets (list of tuple) -- вложенные листы: (идентификатор листа,
+            имя листа, имя файла листа);
+        symbolInstances (dict) -- сведения об экземплярах символов по
+            полным путям (KiCad 6, только в корневом листе): путь ->
+            словарь ("reference", "unit", "value", "footprint").
+
+        """
+        self.fileName = fileName
+        self.uuid = None
+        self.paper = ""
+        self.titleBlock = {}
+        self.libSymbols = {}
+        self.symbols = []
+        self.sheets = []
+        self.symbolInstances = {}
+        with open(fileName, encoding="utf-8") as schematic:
+            try:
+                root = parseExpression(
+                    schematic.read(),
+                    _SCH_HEADER if headerOnly else None
+                )
+            except ParseException as error:
+                raise ParseException(
+                    error.line,
+                    error.pos,
+                    "{}\n(файл \"{}\")".format(error.message, fileName)
+                ) from None
+        if not root or root[0] != "kicad_sch":
+            raise ParseException(1, 1,
+                "Файл \"{}\" не является файлом схемы KiCad!".format(fileName)
+            )
+        for item in root[1:]:
+            if not isinstance(item, list) or not item:
+                continue
+            name = item[0]
+            if name == "symbol":
+                self.symbols.append(self._getSymbol(item))
+            elif name == "sheet":
+                self.sheets.append(self._getSheet(item))
+            elif name == "uuid":
+                self.uuid = _getValue(item)
+            elif name == "paper":
+                self.paper = _getValue(item) or ""
+            elif name == "title_block":
+                self._setTitleBlock(item)
+            elif name == "lib_symbols":
+                self._setLibSymbols(item)
+            elif name == "symbol_instances":
+                self._setSymbolInstances(item)
+
+    def _setTitleBlock(self, titleBlock):
+        """Считать основную надпись."""
+        for item in titleBlock[1:]:
+            if not isinstance(item, list) or not item:
+                continue
+            if item[0] == "comment":
+                value = _getValue(item, 2)
+                self.titleBlock["comment " + str(_getValue(item))] = value or ""
+            else:
+                self.titleBlock[item[0]] = _getValue(item) or ""
+
+    def _setLibSymbols(self, libSymbols):
+        """Считать описания символов библиотеки."""
+        for symbol in libSymbols[1:]:
+            if not isinstance(symbol, list) or symbol[0] != "symbol":
+                continue
+            description = None
+            power = False
+            for item in symbol[2:]:
+                if not isinstance(item, list) or not item:
+                    continue
+                if item[0] == "power":
+                    power = True
+                elif item[0] == "property" \
+                    and _getValue(item) in ("ki_description", "Description"):
+                        description = _getValue(item, 2)
+            self.libSymbols[_getValue(symbol)] = (description, power)
+
+    def _setSymbolInstances(self, symbolInstances):
+        """Считать сведения об экземплярах символов (KiCad 6)."""
+        for path in symbolInstances[1:]:
+            if not isinstance(path, list) or path[0] != "path":
+                continue
+            instance = {}
+            for item in path[2:]:
+                if isinstance(item, list) and item:
+                    instance[item[0]] = _getValue(item)
+            self.symbolInstances[_getValue(path)] = instance
+
+    @staticmethod
+    def _getSymbol(symbol):
+        """Вернуть сведения о символе листа."""
+        uuid = None
+        libId = None
+        libName = None
+        properties = {}
+        instances = {}
+        for item in symbol[1:]:
+            if not isinstance(item, list) or not item:
+                continue
+            name = item[0]
+            if name == "property":
+                propertyName = _getValue(item)
+                if propertyName is not None and propertyName not in properties:
+                    properties[propertyName] = _getValue(item, 2) or ""
+            elif name == "lib_id":
+                libId = _getValue(item)
+            elif name == "lib_name":
+                libName = _getValue(item)
+            elif name == "uuid":
+                uuid = _getValue(item)
+            elif name == "instances":
+                for project in item[1:]:
+                    if not isinstance(project, list) or project[0] != "project":
+                        continue
+                    for path in project[2:]:
+                        if not isinstance(path, list) or path[0] != "path":
+                            continue
+                        for value in path[2:]:
+                            if isinstance(value, list) and value[0] == "reference":
+                                instances.setdefault(_getValue(path), _getValue(value))
+        return (uuid, libName or libId, properties, instances)
+
+    @staticmethod
+    def _getSheet(sheet):
+        """Вернуть сведения о вложенном листе."""
+        uuid = None
+        properties = {}
+        for item in sheet[1:]:
+            if not isinstance(item, list) or not item:
+                continue
+            if item[0] == "uuid":
+                uuid = _getValue(item)
+            elif item[0] == "property":
+                properties[_getValue(item)] = _getValue(item, 2) or ""
+        name = next(
+            (properties[key] for key in _SHEET_NAME_PROPERTIES if key in properties),
+            ""
+        )
+        fileName = next(
+            (properties[key] for key in _SHEET_FILE_PROPERTIES if key in properties),
+            ""
+        )
+        return (uuid, name, fileName)
+
+
+class LegacySheetFile():
+    """Содержимое файла схемы KiCad 5 (одного листа иерархической схемы).
+
+    Атрибуты -- как у SheetFile. Обозначения экземпляров символов (строки
+    AR) хранятся по путям листов, описания символов библиотеки в файле
+    схемы отсутствуют.
+
+    """
+
+    def __init__(self, fileName, headerOnly=False):
+        """Считать файл схемы.
+
+        Аргументы:
+        fileName (str) -- полное имя файла схемы (*.sch);
+        headerOnly (bool) -- считать только формат листа и основную надпись
+            (чтение файла прекращается после строки $EndDescr).
+
+        """
+        self.fileName = fileName
+        self.uuid = None
+        self.paper = ""
+        self.titleBlock = {}
+        self.libSymbols = {}
+        self.symbols = []
+        self.sheets = []
+        self.symbolInstances = {}
+        with open(fileName, encoding="utf-8") as schematic:
+            lines = iter(schematic)
+            for line in lines:
+                if line.startswith("$Comp"):
+                    self.symbols.append(self._getSymbol(lines))
+                elif line.startswith("$Sheet"):
+                    self.sheets.append(self._getSheet(lines))
+                elif line.startswith("$Descr"):
+                    self._setTitleBlock(line, lines)
+                    if headerOnly:
+                        break
+
+    def _setTitleBlock(self, descr, lines):
+        """Считать формат листа и основную надпись (до строки $EndDescr)."""
+        match = _LEGACY_DESCR.match(descr)
+        if match:
+            self.paper = match.group(1)
+        for line in lines:
+            if line.startswith("$EndDescr"):
+                break
+            match = _LEGACY_TITLE.match(line)
+            if match:
+                name, value = match.groups()
+                if name.startswith("Comment"):
+                    name = "comment " + name[7:]
+                else:
+                    name = _LEGACY_TITLE_NAMES[name]
+                self.titleBlock[name] = _unquote(value)
+
+    @staticmethod
+    def _getSymbol(lines):
+        """Вернуть сведения о компоненте (до строки $EndComp)."""
+        uuid = None
+        libId = None
+        properties = {}
+        instances = {}
+        for line in lines:
+            if line.startswith("$EndComp"):
+                break
+            if line.startswith("F "):
+                match = _LEGACY_FIELD.match(line)
+                if match is None:
+                    continue
+                number, value, name = match.groups()
+                number = int(number)
+                if number < len(_LEGACY_FIELD_NAMES):
+                    name = _LEGACY_FIELD_NAMES[number]
+                elif name is None:
+                    continue
+                else:
+                    name = _unquote(name)
+                if name not in properties:
+                    properties[name] = _unquote(value)
+            elif line.startswith("L "):
+                parts = line.split()
+                if len(parts) > 1:
+                    libId = parts[1]
+            elif line.startswith("U "):
+                parts = line.split()
+                if len(parts) > 3:
+                    uuid = parts[3]
+            elif line.startswith("AR "):
+                match = _LEGACY_INSTANCE.match(line)
+                if match:
+                    # Путь экземпляра: идентификаторы листов и компонента;
+                    # обозначение хранится по пути листа.
+                    path, reference = match.groups()
+                    sheetPath = path.rpartition("/")[0] or "/"
+                    instances.setdefault(sheetPath, reference)
+        return (uuid, libId, properties, instances)
+
+    @staticmethod
+    def _getSheet(lines):
+        """Вернуть сведения о вложенном листе (до строки $EndSheet)."""
+        uuid = None
+        name = ""
+        fileName = ""
+        for line in lines:
+            if line.startswith("$EndSheet"):
+                break
+            if line.startswith("U "):
+                uuid = line[2:].strip()
+            elif line.startswith("F"):
+                match = _LEGACY_SHEET_FIELD.match(line)
+                if match is None:
+                    continue
+                if match.group(1) == "0":
+                    name = _unquote(match.group(2))
+                else:
+                    fileName = _unquote(match.group(2))
+        return (uuid, name, fileName)
+
+
+class KicadSchematic():
+    """Иерархическая схема KiCad."""
+
+    def __init__(self, fileName):
+        """Считать схему.
+
+        Аргументы:
+        fileName (str) -- полное имя файла корневого листа схемы
+            (*.kicad_sch -- KiCad 6 и новее, *.sch -- KiCad 5).
+
+        Атрибуты:
+        fileName (str) -- полное имя файла корневого листа схемы;
+        titleBlock (dict of str) -- основная надпись корневого листа (см.
+            SheetFile);
+        components (list of ComponentRecord) -- записи о компонентах всех
+            экземпляров листов схемы (символы питания не включаются,
+            несколько частей одного компонента объединяются в одну запись).
+            Признаки dnp, in_bom и on_board не учитываются.
+
+        """
+        self.fileName = os.path.abspath(fileName)
+        self.titleBlock = {}
+        self.components = []
+        sheetFiles = {}
+        root = readSheetFile(self.fileName)
+        sheetFiles[self.fileName] = root
+        self.titleBlock = root.titleBlock
+        records = {}
+        # Экземпляры листов текущего уровня иерархии: путь (идентификаторы
+        # листов), имена файлов листов от корневого до текущего и
+        # содержимое файла листа.
+        level = [((), (self.fileName,), root)]
+        while level:
+            nextLevel = []
+            for path, ancestors, sheetFile in level:
+                self._appendRecords(records, root, sheetFile, path)
+                for uuid, _, sheetFileName in sheetFile.sheets:
+                    sheetFileName = self._getSheetFileName(
+                        sheetFileName,
+                        sheetFile.fileName
+                    )
+                    if sheetFileName in ancestors:
+                        raise ParseException(1, 1,
+                            "Лист \"{}\" содержит сам себя!".format(sheetFileName)
+                        )
+                    nextLevel.append(
+                        (path + (uuid,), ancestors + (sheetFileName,), sheetFileName)
+                    )
+            # Каждый файл листа разбирается один раз.
+            for _, _, name in nextLevel:
+                if name not in sheetFiles:
+                    sheetFiles[name] = readSheetFile(name)
+            level = [
+                (path, ancestors, sheetFiles[name])
+                for path, ancestors, name in nextLevel
+            ]
+        self.components = list(records.values())
+
+    def _getSheetFileName(self, sheetFileName, parentFileName):
+        """Вернуть полное имя файла вложенного листа.
+
+        Имя файла указывается относительно каталога родительского листа; для
+        совместимости проверяется также каталог корневого листа.
+
+        """
+        sheetFileName = sheetFileName.replace("\\", "/")
+        fileName = os.path.normpath(
+            os.path.join(os.path.dirname(parentFileName), sheetFileName)
+        )
+        if not os.path.exists(fileName):
+            rootFileName = os.path.normpath(
+                os.path.join(os.path.dirname(self.fileName), sheetFileName)
+            )
+            if os.path.exists(rootFileName):
+                return rootFileName
+        return fileName
+
+    @staticmethod
+    def _appendRecords(records, root, sheetFile, path):
+        """Добавить записи о компонентах экземпляра листа.
+
+        Аргументы:
+        records (dict) -- записи о компонентах по обозначениям;
+        root (SheetFile) -- корневой лист схемы;
+        sheetFile (SheetFile) -- лист схемы;
+        path (tuple of str) -- идентификаторы листов от корневого до
+            экземпляра листа (для корневого листа -- пустой).
+
+        """
+        # Путь листа в сведениях об экземплярах символов: KiCad 7 и новее
+        # включают в путь идентификатор корневого листа, KiCad 5 -- нет
+        # (KiCad 6 хранит сведения об экземплярах в корневом листе).
+        if root.uuid is not None:
+            sheetPath = "/" + "/".join((root.uuid,) + path)
+        else:
+            sheetPath = "/" + "/".join(path)
+        instancePrefix = "/" + "".join(uuid + "/" for uuid in path)
+        for uuid, libKey, properties, instances in sheetFile.symbols:
+            instance = root.symbolInstances.get(instancePrefix + str(uuid), {})
+            reference = instance.get("reference") \
+                or instances.get(sheetPath) \
+                or properties.get("Reference", "")
+            description, power = sheetFile.libSymbols.get(libKey, (None, False))
+            if power or reference.startswith("#"):
+                continue
+            value = instance.get("value") or properties.get("Value", "")
+            footprint = instance.get("footprint") or properties.get("Footprint", "")
+            datasheet = properties.get("Datasheet", "")
+            if properties.get("Description"):
+                description = properties["Description"]
+            fields = {
+                name: value for name, value in properties.items()
+                if value and name not in _MANDATORY_FIELDS and not name.startswith("ki_")
+            }
+            record = records.get(reference)
+            if record is None or reference.endswith("?"):
+                key = reference if not reference.endswith("?") else (reference, len(records))
+                records[key] = ComponentRecord(
+                    reference,
+                    value,
+                    footprint,
+                    datasheet,
+                    description,
+                    fields
+                )
+                continue
+            # Другая часть уже добавленного компонента: дополнить запись.
+            # Словарь полей копируется -- запись не должна изменяться на
+            # месте (она может быть уже передана или использоваться в
+            # другом месте).
+            mergedFields = dict(record.fields)
+            for name, fieldValue in fields.items():
+                mergedFields.setdefault(name, fieldValue)
+            records[reference] = record._replace(
+                value=record.value or value,
+                footprint=record.footprint or footprint,
+                datasheet=record.datasheet or datasheet,
+                description=record.description or description,
+                fields=mergedFields
+            )
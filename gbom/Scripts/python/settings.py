@@ -163,7 +163,8 @@ def setup(*args):
 файл списка цепей KiCad.
 Поддерживаются файлы с расширением
 *.net (Pcbnew) и с расширением
-*.xml (вспомогательный)."""
+*.xml (вспомогательный), в том числе
+сжатые (*.gz, *.xz)."""
     pageModel0.insertByName("Label00", labelModel00)
 
     buttonModel00 = pageModel0.createInstance(
@@ -730,7 +731,7 @@ def setup(*args):
     buttonModel10.Width = tabsModel.Width - 7
     buttonModel10.Height = 16
     buttonModel10.PositionX = 2
-    buttonModel10.PositionY = 196
+    buttonModel10.PositionY = 166
     buttonModel10.Name = "Button10"
     buttonModel10.Label = "Установить значения по умолчанию"
     pageModel1.insertByName("Button10", buttonModel10)
@@ -741,7 +742,7 @@ def setup(*args):
     buttonModel11.Width = tabsModel.Width - 7
     buttonModel11.Height = 16
     buttonModel11.PositionX = 2
-    buttonModel11.PositionY = 214
+    buttonModel11.PositionY = 184
     buttonModel11.Name = "Button11"
     buttonModel11.Label = "Установить значения, совместимые с kicadbom2spec"
     pageModel1.insertByName("Button11", buttonModel11)
@@ -752,7 +753,7 @@ def setup(*args):
     checkModel10.Width = tabsModel.Width - 7
     checkModel10.Height = 15
     checkModel10.PositionX = 2
-    checkModel10.PositionY = 232
+    checkModel10.PositionY = 202
     checkModel10.Name = "CheckBox10"
     checkModel10.State = \
         {False: 0, True: 1}[config.getboolean("settings", "compatibility mode")]
@@ -765,6 +766,76 @@ def setup(*args):
 и словарь наименований групп."""
     pageModel1.insertByName("CheckBox10", checkModel10)
 
+    checkModel11 = pageModel1.createInstance(
+        "com.sun.star.awt.UnoControlCheckBoxModel"
+    )
+    checkModel11.Width = tabsModel.Width - 7
+    checkModel11.Height = 15
+    checkModel11.PositionX = 2
+    checkModel11.PositionY = checkModel10.PositionY + checkModel10.Height
+    checkModel11.Name = "CheckBox11"
+    checkModel11.State = \
+        {False: 0, True: 1}[config.getboolean("settings", "parse in separate process")]
+    checkModel11.Label = "Разбирать список цепей в отдельном процессе"
+    checkModel11.HelpText = """\
+Если отмечено, то файл списка цепей
+будет разобран установленным в системе
+интерпретатором Python в отдельном
+процессе. Если интерпретатор не найден,
+файл разбирается как обычно."""
+    pageModel1.insertByName("CheckBox11", checkModel11)
+
+    checkModel12 = pageModel1.createInstance(
+        "com.sun.star.awt.UnoControlCheckBoxModel"
+    )
+    checkModel12.Width = tabsModel.Width - 7
+    checkModel12.Height = 15
+    checkModel12.PositionX = 2
+    checkModel12.PositionY = checkModel11.PositionY + checkModel11.Height
+    checkModel12.Name = "CheckBox12"
+    checkModel12.State = \
+        {False: 0, True: 1}[config.getboolean("settings", "netlist cache")]
+    checkModel12.Label = "Сохранять результаты разбора списка цепей"
+    checkModel12.HelpText = """\
+Если отмечено, то результаты разбора
+файла списка цепей сохраняются в
+каталоге кэша пользователя и при
+повторном построении документа файл
+не разбирается, если он не изменился."""
+    pageModel1.insertByName("CheckBox12", checkModel12)
+
+    labelModel19 = pageModel1.createInstance(
+        "com.sun.star.awt.UnoControlFixedTextModel"
+    )
+    labelModel19.PositionX = 0
+    labelModel19.PositionY = checkModel12.PositionY + checkModel12.Height
+    labelModel19.Width = labelModel10.Width
+    labelModel19.Height = labelModel10.Height
+    labelModel19.VerticalAlign = uno.Enum(
+        "com.sun.star.style.VerticalAlignment",
+        "MIDDLE"
+    )
+    labelModel19.Name = "Label19"
+    labelModel19.Label = "Интерпретатор Python:"
+    labelModel19.HelpText = """\
+Полное имя исполняемого файла
+интерпретатора Python для разбора
+списка цепей в отдельном процессе.
+Если не указано, интерпретатор
+ищется в системе (python3, python)."""
+    pageModel1.insertByName("Label19", labelModel19)
+
+    editControlModel19 = pageModel1.createInstance(
+        "com.sun.star.awt.UnoControlEditModel"
+    )
+    editControlModel19.Width = tabsModel.Width - labelModel19.Width - 3
+    editControlModel19.Height = labelModel19.Height
+    editControlModel19.PositionX = labelModel19.Width
+    editControlModel19.PositionY = labelModel19.PositionY
+    editControlModel19.Name = "EditControl19"
+    editControlModel19.Text = config.get("settings", "python interpreter")
+    pageModel1.insertByName("EditControl19", editControlModel19)
+
     # ------------------------------------------------------------------------
     # Stamp Tab Model
     # ------------------------------------------------------------------------
@@ -1054,6 +1125,15 @@ class ButtonOKActionListener(unohelper.Base, XActionListener):
         config.set("settings", "compatibility mode",
             {0: "no", 1: "yes"}[page1.getControl("CheckBox10").State]
         )
+        config.set("settings", "parse in separate process",
+            {0: "no", 1: "yes"}[page1.getControl("CheckBox11").State]
+        )
+        config.set("settings", "netlist cache",
+            {0: "no", 1: "yes"}[page1.getControl("CheckBox12").State]
+        )
+        config.set("settings", "python interpreter",
+            page1.getControl("EditControl19").Text
+        )
 
         # --------------------------------------------------------------------
         # Основная надпись
@@ -1094,7 +1174,7 @@ class Button00ActionListener(unohelper.Base, XActionListener):
         editControl = self.dialog.getControl("Tabs").getControl("Page0").getControl("EditControl00")
         source = common.showFilePicker(
             editControl.Text,
-            **{"Список цепей KiCad": "*.net;*.xml", "Все файлы": "*.*"}
+            **{"Список цепей KiCad": "*.net;*.xml;*.net.gz;*.xml.gz;*.net.xz;*.xml.xz", "Схема KiCad": "*.kicad_sch;*.sch", "Все файлы": "*.*"}
         )
         if source is not None:
             editControl.Text = source
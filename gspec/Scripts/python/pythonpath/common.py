@@ -15,6 +15,7 @@ import uno
 XSCRIPTCONTEXT = None
 schematic = None
 kicadnet = None
+kicadsch = None
 config = None
 textwidth = None
 
@@ -22,11 +23,13 @@ def init(scriptcontext):
     global XSCRIPTCONTEXT
     global schematic
     global kicadnet
+    global kicadsch
     global config
     global textwidth
     XSCRIPTCONTEXT = scriptcontext
     schematic = sys.modules["schematic" + scriptcontext.getDocument().RuntimeUID]
     kicadnet = sys.modules["kicadnet" + scriptcontext.getDocument().RuntimeUID]
+    kicadsch = sys.modules["kicadsch" + scriptcontext.getDocument().RuntimeUID]
     config = sys.modules["config" + scriptcontext.getDocument().RuntimeUID]
     textwidth = sys.modules["textwidth" + XSCRIPTCONTEXT.getDocument().RuntimeUID]
 
@@ -200,18 +203,35 @@ def getSourceFileName():
     if docUrl:
         docPath = uno.fileUrlToSystemPath(docUrl)
         sourceDir = os.path.dirname(docPath)
+        candidates = []
         for fileName in os.listdir(sourceDir):
-            if fileName.endswith(".pro"):
+            if fileName.endswith(".kicad_pro"):
+                sourceName = fileName.replace(".kicad_pro", ".net")
+                # KiCad 6 и новее: если список цепей не экспортирован, данные
+                # о схеме считываются непосредственно из файлов схемы.
+                candidates = [
+                    sourceName,
+                    sourceName + ".gz",
+                    sourceName + ".xz",
+                    fileName.replace(".kicad_pro", ".kicad_sch")
+                ]
+            elif fileName.endswith(".pro"):
                 sourceName = fileName.replace(".pro", ".net")
-        if sourceName:
-            sourcePath = os.path.join(sourceDir, sourceName)
+                # Список цепей может быть сжат (*.net.gz, *.net.xz).
+                candidates = [
+                    sourceName,
+                    sourceName + ".gz",
+                    sourceName + ".xz"
+                ]
+        for candidate in candidates:
+            sourcePath = os.path.join(sourceDir, candidate)
             if os.path.exists(sourcePath):
                 config.set("doc", "source", sourcePath)
                 config.save()
                 return sourcePath
     sourcePath = showFilePicker(
         os.path.join(sourceDir, sourceName),
-        **{"Список цепей KiCad": "*.net;*.xml", "Все файлы": "*.*"}
+        **{"Список цепей KiCad": "*.net;*.xml;*.net.gz;*.xml.gz;*.net.xz;*.xml.xz", "Схема KiCad": "*.kicad_sch;*.sch", "Все файлы": "*.*"}
     )
     if sourcePath is not None:
         config.set("doc", "source", sourcePath)
@@ -219,12 +239,15 @@ def getSourceFileName():
         return sourcePath
     return None
 
-def getSchematicData():
+def getSchematicData(options=None):
     """Подготовить необходимые данные о схеме.
 
     Выбрать из файла данные о компонентах и данные для заполнения
     основной надписи.
 
+    options (config.Snapshot) -- снимок параметров, полученный в начале
+        построения документа (None -- получить снимок).
+
     Возвращаемое значение -- объект класса Schematic или None, если
         файл не найден или данные в файле отсутствуют.
 
@@ -238,8 +261,8 @@ def getSchematicData():
         #)
         return None
     try:
-        return schematic.Schematic(sourceFileName)
-    except kicadnet.ParseException as error:
+        return schematic.Schematic(sourceFileName, options)
+    except (kicadnet.ParseException, kicadsch.ParseException) as error:
         showMessage(
             "Не удалось получить данные о схеме.\n\n" \
             "При разборе файла обнаружена ошибка:\n" \
@@ -254,10 +277,23 @@ def getSchematicData():
         )
     return None
 
+def getSourceBaseName(sourcePath):
+    """Вернуть имя файла данных о схеме без расширения.
+
+    Расширение сжатого файла списка цепей также отбрасывается, например:
+    "project.net.gz" -> "project".
+
+    """
+    baseName, extension = os.path.splitext(sourcePath)
+    if extension.lower() in (".gz", ".xz"):
+        baseName = os.path.splitext(baseName)[0]
+    return baseName
+
 def getSchematicInfo():
     """Считать формат листа и децимальный номер из файла схемы.
 
-    Файл схемы определяется на основе имени выбранного файла списка цепей.
+    Файл схемы определяется на основе имени выбранного файла списка цепей
+    (или является выбранным файлом схемы).
     Изымаются только данные о формате листа и децимальный номер (комментарий 1).
 
     Возвращаемое значение -- кортеж с двумя значениями:
@@ -266,20 +302,14 @@ def getSchematicInfo():
     """
     try:
         sourcePath = config.get("doc", "source")
-        schPath = os.path.splitext(sourcePath)[0] + ".sch"
-        size = ""
-        number = ""
+        if sourcePath.endswith((".kicad_sch", ".sch")):
+            schPath = sourcePath
+        else:
+            schPath = getSourceBaseName(sourcePath) + ".sch"
         if os.path.exists(schPath):
-            with open(schPath, encoding="utf-8") as schematic:
-                sizePattern = r"^\$Descr ([^\s]+) \d.*$"
-                numberPattern = r"^Comment1 \"(.*)\"$"
-                for line in schematic:
-                    if re.match(sizePattern, line):
-                        size = re.search(sizePattern, line).group(1)
-                    elif re.match(numberPattern, line):
-                        number = re.search(numberPattern, line).group(1)
-                        break
-        return (size, number)
+            sheetFile = kicadsch.readSheetFile(schPath, headerOnly=True)
+            return (sheetFile.paper, sheetFile.titleBlock.get("comment 1", ""))
+        return ("", "")
     except:
         return ("", "")
 
@@ -295,7 +325,7 @@ def getPcbInfo():
     """
     try:
         sourcePath = config.get("doc", "source")
-        pcbPath = os.path.splitext(sourcePath)[0] + ".kicad_pcb"
+        pcbPath = getSourceBaseName(sourcePath) + ".kicad_pcb"
         size = ""
         number = ""
         if os.path.exists(pcbPath):
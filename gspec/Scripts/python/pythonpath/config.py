@@ -7,6 +7,7 @@
 
 import os
 import sys
+from collections import namedtuple
 from configparser import ConfigParser
 import tempfile
 import zipfile
@@ -19,6 +20,64 @@ def init(scriptcontext):
     global XSCRIPTCONTEXT
     XSCRIPTCONTEXT = scriptcontext
 
+# Значения параметров по умолчанию.
+DEFAULTS = {
+    "doc": {
+        "source": "",
+        "ref separator": "-",
+        "add units": "yes",
+        "space before units": "no",
+        "separate group for each doc": "no",
+        "title with doc": "no",
+        "every group has title": "no",
+        "reserve position numbers": "no",
+        "empty row after group title": "no",
+        "empty rows between diff type": 1,
+        "prohibit titles at bottom": "no",
+        "prohibit empty rows at top": "no",
+        "extreme width factor": 80,
+        "append rev table": "no",
+        "pages rev table": 3,
+        "footprint only": "yes",
+    },
+    "sections": {
+        "documentation": "yes",
+        "assembly drawing": "no",
+        "schematic": "yes",
+        "index": "yes",
+        "bom": "no",
+        "bom name": "Ведомость покупных изделий",
+        "assembly units": "no",
+        "details": "yes",
+        "pcb": "yes",
+        "standard parts": "no",
+        "other parts": "yes",
+        "materials": "no",
+    },
+    "fields": {
+        "type": "Тип",
+        "name": "Наименование",
+        "doc": "Документ",
+        "comment": "Примечание",
+        "excluded": "",
+    },
+    "stamp": {
+        "convert doc title": "yes",
+        "convert doc id": "yes",
+        "fill first usage": "yes",
+        "place doc id to table title": "yes",
+    },
+    "settings": {
+        "pos x": "100",
+        "pos y": "100",
+        "set view options": "yes",
+        "compatibility mode": "no",
+        "parse in separate process": "no",
+        "python interpreter": "",
+        "netlist cache": "yes",
+    }
+}
+
 SETTINGS = ConfigParser()
 
 def load():
@@ -27,61 +86,7 @@ def load():
     Считать параметры работы из файла.
 
     """
-    SETTINGS.read_dict(
-        {
-            "doc": {
-                "source": "",
-                "ref separator": "-",
-                "add units": "yes",
-                "space before units": "no",
-                "separate group for each doc": "no",
-                "title with doc": "no",
-                "every group has title": "no",
-                "reserve position numbers": "no",
-                "empty row after group title": "no",
-                "empty rows between diff type": 1,
-                "prohibit titles at bottom": "no",
-                "prohibit empty rows at top": "no",
-                "extreme width factor": 80,
-                "append rev table": "no",
-                "pages rev table": 3,
-                "footprint only": "yes",
-            },
-            "sections": {
-                "documentation": "yes",
-                "assembly drawing": "no",
-                "schematic": "yes",
-                "index": "yes",
-                "bom": "no",
-                "bom name": "Ведомость покупных изделий",
-                "assembly units": "no",
-                "details": "yes",
-                "pcb": "yes",
-                "standard parts": "no",
-                "other parts": "yes",
-                "materials": "no",
-            },
-            "fields": {
-                "type": "Тип",
-                "name": "Наименование",
-                "doc": "Документ",
-                "comment": "Примечание",
-                "excluded": "",
-            },
-            "stamp": {
-                "convert doc title": "yes",
-                "convert doc id": "yes",
-                "fill first usage": "yes",
-                "place doc id to table title": "yes",
-            },
-            "settings": {
-                "pos x": "100",
-                "pos y": "100",
-                "set view options": "yes",
-                "compatibility mode": "no",
-            }
-        }
-    )
+    SETTINGS.read_dict(DEFAULTS)
 
     doc = XSCRIPTCONTEXT.getDocument()
     ctx = XSCRIPTCONTEXT.getComponentContext()
@@ -142,6 +147,54 @@ def set(section, option, value):
     """Установить значение "value" параметру "option" из раздела "section"."""
     return SETTINGS.set(section, option, value)
 
+def attributeName(option):
+    """Вернуть имя атрибута снимка для параметра "option".
+
+    Например: "add units" -> "addUnits".
+
+    """
+    words = option.split()
+    return words[0] + "".join(word.capitalize() for word in words[1:])
+
+# Типы разделов снимка параметров (см. getSnapshot).
+SNAPSHOT_SECTIONS = {
+    section: namedtuple(
+        section.capitalize() + "Snapshot",
+        [attributeName(option) for option in options]
+    )
+    for section, options in DEFAULTS.items()
+}
+Snapshot = namedtuple("Snapshot", DEFAULTS.keys())
+
+def getSnapshot():
+    """Получить неизменяемый снимок параметров.
+
+    Значения всех параметров считываются один раз и приводятся к типу
+    значения по умолчанию: "yes"/"no" -- bool, целое число -- int,
+    остальные -- str. Снимок создаётся в начале построения документа,
+    поэтому параметры не могут измениться в процессе построения, а
+    обращение к ним сводится к чтению атрибута, например:
+
+    getSnapshot().doc.addUnits
+
+    Возвращаемое значение (Snapshot) -- именованный кортеж разделов,
+        каждый из которых -- именованный кортеж значений параметров
+        (имена атрибутов см. attributeName).
+
+    """
+    sections = []
+    for section, options in DEFAULTS.items():
+        values = []
+        for option, default in options.items():
+            if isinstance(default, int) or default.lstrip("-").isdigit():
+                values.append(SETTINGS.getint(section, option))
+            elif default in ("yes", "no"):
+                values.append(SETTINGS.getboolean(section, option))
+            else:
+                values.append(SETTINGS.get(section, option))
+        sections.append(SNAPSHOT_SECTIONS[section](*values))
+    return Snapshot(*sections)
+
 def loadFromKicadbom2spec():
     """Загрузить настройки kicadbom2spec.
 
@@ -187,7 +187,7 @@ class SpecBuildingThread(threading.Thread):
         def fillRow(values, isTitle=False, posIncrement=0):
             colWidth = (5, 5, 7, 69, 62, 9, 9, 9, 9, 9, 9, 9, 9, 9, 9, 32)
             extraRow = [""] * len(values)
-            extremeWidthFactor = config.getint("doc", "extreme width factor")
+            extremeWidthFactor = options.doc.extremeWidthFactor
             doc.lockControllers()
             for col in range(len(values)):
                 if values[col] == "" and not (col == 2 and posIncrement != 0):
@@ -261,7 +261,10 @@ class SpecBuildingThread(threading.Thread):
         # Начало построения таблицы
         # --------------------------------------------------------------------
         try:
-            schematic = common.getSchematicData()
+            # Параметры считываются один раз и не меняются в процессе
+            # построения.
+            options = config.getSnapshot()
+            schematic = common.getSchematicData(options)
             if schematic is None:
                 return
             doc = XSCRIPTCONTEXT.getDocument()
@@ -306,10 +309,10 @@ class SpecBuildingThread(threading.Thread):
                     return
             compGroups = schematic.getGroupedComponents()
             prevGroup = None
-            emptyRowsType = config.getint("doc", "empty rows between diff type")
+            emptyRowsType = options.doc.emptyRowsBetweenDiffType
 
             progressTotal = 5 if self.update else 8
-            if config.getboolean("sections", "other parts"):
+            if options.sections.otherParts:
                 for group in compGroups:
                     progressTotal += len(group)
             progressMessage = "Выполняется построение спецификации"
@@ -359,17 +362,17 @@ class SpecBuildingThread(threading.Thread):
             table.Rows.insertByIndex(self.currentRow, 1)
 
             if not self.update:
-                if config.getboolean("sections", "documentation"):
-                    if not config.getboolean("doc", "prohibit empty rows at top"):
+                if options.sections.documentation:
+                    if not options.doc.prohibitEmptyRowsAtTop:
                         gotoNextRow()
                     fillSectionTitle("Документация")
 
-                    if config.getboolean("sections", "assembly drawing") \
-                        or config.getboolean("sections", "schematic") \
-                        or config.getboolean("sections", "index"):
+                    if options.sections.assemblyDrawing \
+                        or options.sections.schematic \
+                        or options.sections.index:
                             gotoNextRow()
 
-                    if config.getboolean("sections", "assembly drawing"):
+                    if options.sections.assemblyDrawing:
                         size, ref = common.getPcbInfo()
                         if not ref:
                             _, ref = common.getSchematicInfo()
@@ -386,14 +389,14 @@ class SpecBuildingThread(threading.Thread):
                             [size, "", "", ref, name, "X"]
                         )
 
-                    if config.getboolean("sections", "schematic"):
+                    if options.sections.schematic:
                         size, ref = common.getSchematicInfo()
                         name = "Схема электрическая принципиальная"
                         fillRow(
                             [size, "", "", ref, name, "X"]
                         )
 
-                    if config.getboolean("sections", "index"):
+                    if options.sections.index:
                         size, ref = common.getSchematicInfo()
                         size = "A4"
                         refParts = re.match(
@@ -407,7 +410,7 @@ class SpecBuildingThread(threading.Thread):
                             [size, "", "", ref, name, "X"]
                         )
 
-                    if config.getboolean("sections", "bom"):
+                    if options.sections.bom:
                         size, ref = common.getSchematicInfo()
                         size = "A3"
                         refParts = re.match(
@@ -416,7 +419,7 @@ class SpecBuildingThread(threading.Thread):
                         )
                         if refParts is not None:
                             ref = refParts[1] + 'ВП'
-                        name = config.get("sections", "bom name")
+                        name = options.sections.bomName
                         if not name:
                             name = "Ведомость покупных изделий"
                         fillRow(
@@ -425,17 +428,17 @@ class SpecBuildingThread(threading.Thread):
 
                 progressDialog.stepUp()
 
-                if config.getboolean("sections", "assembly units"):
+                if options.sections.assemblyUnits:
                     gotoNextRow()
                     fillSectionTitle("Сборочные единицы")
 
                 progressDialog.stepUp()
 
-                if config.getboolean("sections", "details"):
+                if options.sections.details:
                     gotoNextRow()
                     fillSectionTitle("Детали")
 
-                    if config.getboolean("sections", "pcb"):
+                    if options.sections.pcb:
                         gotoNextRow()
                         name = "Плата печатная"
                         fillRow(
@@ -445,13 +448,13 @@ class SpecBuildingThread(threading.Thread):
 
                 progressDialog.stepUp()
 
-                if config.getboolean("sections", "standard parts"):
+                if options.sections.standardParts:
                     gotoNextRow()
                     fillSectionTitle("Стандартные изделия")
 
                 progressDialog.stepUp()
 
-            if config.getboolean("sections", "other parts"):
+            if options.sections.otherParts:
                 if not self.update:
                     gotoNextRow()
                 fillSectionTitle("Прочие изделия")
@@ -463,10 +466,10 @@ class SpecBuildingThread(threading.Thread):
                         doc.lockControllers()
                         gotoNextRow(emptyRowsType)
                         doc.unlockControllers()
-                        if config.getboolean("doc", "reserve position numbers"):
+                        if options.doc.reservePositionNumbers:
                             increment += emptyRowsType
                     if len(group) == 1 \
-                        and not config.getboolean("doc", "every group has title"):
+                        and not options.doc.everyGroupHasTitle:
                             compType = group[0].getSpecValue("type", singular=True)
                             compName = group[0].getSpecValue("name")
                             compDoc = group[0].getSpecValue("doc")
@@ -497,9 +500,9 @@ class SpecBuildingThread(threading.Thread):
                                     ["", "", "", "", title],
                                     isTitle=True
                                 )
-                        if config.getboolean("doc", "empty row after group title"):
+                        if options.doc.emptyRowAfterGroupTitle:
                             gotoNextRow()
-                            if config.getboolean("doc", "reserve position numbers"):
+                            if options.doc.reservePositionNumbers:
                                 increment += 1
                         for compRange in group:
                             compName = compRange.getSpecValue("name")
@@ -528,7 +531,7 @@ class SpecBuildingThread(threading.Thread):
                     prevGroup = group
 
             if not self.update:
-                if config.getboolean("sections", "materials"):
+                if options.sections.materials:
                     gotoNextRow()
                     fillSectionTitle("Материалы")
                     gotoNextRow()
@@ -539,7 +542,7 @@ class SpecBuildingThread(threading.Thread):
 
             progressDialog.stepUp()
 
-            if config.getboolean("doc", "prohibit titles at bottom"):
+            if options.doc.prohibitTitlesAtBottom:
                 _, firstRowCount, otherRowCount, _ = common.getFirstPageInfo()
                 pos = firstRowCount
                 while pos < table.Rows.Count:
@@ -567,7 +570,7 @@ class SpecBuildingThread(threading.Thread):
 
             progressDialog.stepUp()
 
-            if config.getboolean("doc", "prohibit empty rows at top"):
+            if options.doc.prohibitEmptyRowsAtTop:
                 _, firstRowCount, otherRowCount, _ = common.getFirstPageInfo()
                 pos = firstRowCount + 1
                 while pos < table.Rows.Count:
@@ -584,9 +587,9 @@ class SpecBuildingThread(threading.Thread):
 
             progressDialog.stepUp()
 
-            if config.getboolean("doc", "append rev table"):
+            if options.doc.appendRevTable:
                 pageCount = doc.CurrentController.PageCount
-                if pageCount > config.getint("doc", "pages rev table"):
+                if pageCount > options.doc.pagesRevTable:
                     common.appendRevTable()
 
         except StopException:
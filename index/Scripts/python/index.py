@@ -175,7 +175,7 @@ class IndexBuildingThread(threading.Thread):
         def fillRow(values, isTitle=False):
             colWidth = (19, 109, 9, 44)
             extraRow = [""] * len(values)
-            extremeWidthFactor = config.getint("doc", "extreme width factor")
+            extremeWidthFactor = options.doc.extremeWidthFactor
             doc.lockControllers()
             for col in range(len(values)):
                 if values[col] == "":
@@ -227,7 +227,10 @@ class IndexBuildingThread(threading.Thread):
         # Начало построения таблицы
         # --------------------------------------------------------------------
         try:
-            schematic = common.getSchematicData()
+            # Параметры считываются один раз и не меняются в процессе
+            # построения.
+            options = config.getSnapshot()
+            schematic = common.getSchematicData(options)
             if schematic is None:
                 return
             doc = XSCRIPTCONTEXT.getDocument()
@@ -236,8 +239,8 @@ class IndexBuildingThread(threading.Thread):
             table = doc.TextTables["Перечень_элементов"]
             compGroups = schematic.getGroupedComponents()
             prevGroup = None
-            emptyRowsRef = config.getint("doc", "empty rows between diff ref")
-            emptyRowsType = config.getint("doc", "empty rows between diff type")
+            emptyRowsRef = options.doc.emptyRowsBetweenDiffRef
+            emptyRowsType = options.doc.emptyRowsBetweenDiffType
             self.currentRow = table.Rows.Count - 1
             # В процессе заполнения перечня, в конце таблицы всегда должна
             # оставаться пустая строка с ненарушенным форматированием.
@@ -264,7 +267,7 @@ class IndexBuildingThread(threading.Thread):
                     gotoNextRow(emptyRows)
                     doc.unlockControllers()
                 if len(group) == 1 \
-                    and not config.getboolean("doc", "every group has title"):
+                    and not options.doc.everyGroupHasTitle:
                         compRef = group[0].getRefRangeString()
                         compType = group[0].getIndexValue("type", singular=True)
                         compName = group[0].getIndexValue("name")
@@ -288,7 +291,7 @@ class IndexBuildingThread(threading.Thread):
                                 ["", title],
                                 isTitle=True
                             )
-                    if config.getboolean("doc", "empty row after group title"):
+                    if options.doc.emptyRowAfterGroupTitle:
                         gotoNextRow()
                     for compRange in group:
                         compRef = compRange.getRefRangeString()
@@ -312,7 +315,7 @@ class IndexBuildingThread(threading.Thread):
 
             progressDialog.stepUp()
 
-            if config.getboolean("doc", "prohibit titles at bottom"):
+            if options.doc.prohibitTitlesAtBottom:
                 _, firstRowCount, otherRowCount = common.getFirstPageInfo()
                 pos = firstRowCount
                 while pos < table.Rows.Count:
@@ -340,7 +343,7 @@ class IndexBuildingThread(threading.Thread):
 
             progressDialog.stepUp()
 
-            if config.getboolean("doc", "prohibit empty rows at top"):
+            if options.doc.prohibitEmptyRowsAtTop:
                 _, firstRowCount, otherRowCount = common.getFirstPageInfo()
                 pos = firstRowCount + 1
                 while pos < table.Rows.Count:
@@ -356,9 +359,9 @@ class IndexBuildingThread(threading.Thread):
 
             progressDialog.stepUp()
 
-            if config.getboolean("doc", "append rev table"):
+            if options.doc.appendRevTable:
                 pageCount = doc.CurrentController.PageCount
-                if pageCount > config.getint("doc", "pages rev table"):
+                if pageCount > options.doc.pagesRevTable:
                     common.appendRevTable()
 
         except StopException:
@@ -14,6 +14,7 @@ import uno
 XSCRIPTCONTEXT = None
 schematic = None
 kicadnet = None
+kicadsch = None
 config = None
 textwidth = None
 
@@ -21,11 +22,13 @@ def init(scriptcontext):
     global XSCRIPTCONTEXT
     global schematic
     global kicadnet
+    global kicadsch
     global config
     global textwidth
     XSCRIPTCONTEXT = scriptcontext
     schematic = sys.modules["schematic" + scriptcontext.getDocument().RuntimeUID]
     kicadnet = sys.modules["kicadnet" + scriptcontext.getDocument().RuntimeUID]
+    kicadsch = sys.modules["kicadsch" + scriptcontext.getDocument().RuntimeUID]
     config = sys.modules["config" + scriptcontext.getDocument().RuntimeUID]
     textwidth = sys.modules["textwidth" + XSCRIPTCONTEXT.getDocument().RuntimeUID]
 
@@ -182,18 +185,35 @@ def getSourceFileName():
     if docUrl:
         docPath = uno.fileUrlToSystemPath(docUrl)
         sourceDir = os.path.dirname(docPath)
+        candidates = []
         for fileName in os.listdir(sourceDir):
-            if fileName.endswith(".pro"):
+            if fileName.endswith(".kicad_pro"):
+                sourceName = fileName.replace(".kicad_pro", ".net")
+                # KiCad 6 и новее: если список цепей не экспортирован, данные
+                # о схеме считываются непосредственно из файлов схемы.
+                candidates = [
+                    sourceName,
+                    sourceName + ".gz",
+                    sourceName + ".xz",
+                    fileName.replace(".kicad_pro", ".kicad_sch")
+                ]
+            elif fileName.endswith(".pro"):
                 sourceName = fileName.replace(".pro", ".net")
-        if sourceName:
-            sourcePath = os.path.join(sourceDir, sourceName)
+                # Список цепей может быть сжат (*.net.gz, *.net.xz).
+                candidates = [
+                    sourceName,
+                    sourceName + ".gz",
+                    sourceName + ".xz"
+                ]
+        for candidate in candidates:
+            sourcePath = os.path.join(sourceDir, candidate)
             if os.path.exists(sourcePath):
                 config.set("doc", "source", sourcePath)
                 config.save()
                 return sourcePath
     sourcePath = showFilePicker(
         os.path.join(sourceDir, sourceName),
-        **{"Список цепей KiCad": "*.net;*.xml", "Все файлы": "*.*"}
+        **{"Список цепей KiCad": "*.net;*.xml;*.net.gz;*.xml.gz;*.net.xz;*.xml.xz", "Схема KiCad": "*.kicad_sch;*.sch", "Все файлы": "*.*"}
     )
     if sourcePath is not None:
         config.set("doc", "source", sourcePath)
@@ -201,12 +221,15 @@ def getSourceFileName():
         return sourcePath
     return None
 
-def getSchematicData():
+def getSchematicData(options=None):
     """Подготовить необходимые данные о схеме.
 
     Выбрать из файла данные о компонентах и данные для заполнения
     основной надписи.
 
+    options (config.Snapshot) -- снимок параметров, полученный в начале
+        построения документа (None -- получить снимок).
+
     Возвращаемое значение -- объект класса Schematic или None, если
         файл не найден или данные в файле отсутствуют.
 
@@ -220,8 +243,8 @@ def getSchematicData():
         #)
         return None
     try:
-        return schematic.Schematic(sourceFileName)
-    except kicadnet.ParseException as error:
+        return schematic.Schematic(sourceFileName, options)
+    except (kicadnet.ParseException, kicadsch.ParseException) as error:
         showMessage(
             "Не удалось получить данные о схеме.\n\n" \
             "При разборе файла обнаружена ошибка:\n" \
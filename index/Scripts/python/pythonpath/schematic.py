@@ -1,15 +1,20 @@
 """Объектное представление схемы."""
 
+import collections
+import itertools
 import re
 import sys
 
 kicadnet = None
+kicadsch = None
 config = None
 
 def init(scriptcontext):
     global kicadnet
+    global kicadsch
     global config
     kicadnet = sys.modules["kicadnet" + scriptcontext.getDocument().RuntimeUID]
+    kicadsch = sys.modules["kicadsch" + scriptcontext.getDocument().RuntimeUID]
     config = sys.modules["config" + scriptcontext.getDocument().RuntimeUID]
 
 REF_REGEXP = re.compile(r"([^0-9?]+)([0-9]+)")
@@ -18,6 +23,79 @@ REF_REGEXP = re.compile(r"([^0-9?]+)([0-9]+)")
 class Component():
     """Данные о компоненте схемы."""
 
+    # Множители значений: обозначение -> (обозначение на русском, множитель).
+    valueMultipliers = {
+        'G': ('Г', 1e9),
+        'Г': ('Г', 1e9),
+        'M': ('М', 1e6),
+        'М': ('М', 1e6),
+        'k': ('к', 1e3),
+        'к': ('к', 1e3),
+        'm': ('м', 1e-3),
+        'м': ('м', 1e-3),
+        'μ': ('мк', 1e-6),
+        'u': ('мк', 1e-6),
+        'U': ('мк', 1e-6),
+        'мк': ('мк', 1e-6),
+        'n': ('н', 1e-9),
+        'н': ('н', 1e-9),
+        'p': ('п', 1e-12),
+        'п': ('п', 1e-12)
+    }
+    # 2u7, 2н7, 4m7, 5k1 ...
+    regexpr1 = re.compile(
+        r"^(\d+)({})(\d+)$".format('|'.join(valueMultipliers))
+    )
+    # 2.7 u, 2700p, 4.7 m, 470u, 5.1 k, 510 ...
+    regexpr2 = re.compile(
+        r"^(\d+(?:[\.,]\d+)?)\s*({})?$".format('|'.join(valueMultipliers))
+    )
+    # Значения с единицами измерения (см. parseValue). Каждая строка:
+    # (начало буквенной части обозначения, единица измерения,
+    #  окончания значения, отбрасываемые вместе с единицей измерения,
+    #  множитель для целого числа без множителя,
+    #  множитель для дробного числа без множителя,
+    #  буква, заменяющая десятичную запятую, например: R47, 4R7,
+    #  множитель по умолчанию указывается при выводе только для числа без
+    #  единицы измерения и пробелов (например, "100" -> "100пФ", но
+    #  "100F" -> "100Ф"); для вычисления абсолютного значения он
+    #  учитывается всегда).
+    # Строки проверяются по порядку. Например, для кварцевых резонаторов
+    # достаточно добавить строку ("ZQ", "Гц", ("Hz",), "", "", None, False).
+    valueUnits = (
+        ("C", "Ф", ("F",), "п", "мк", None, True),
+        ("L", "Гн", ("H",), "мк", "мк", None, False),
+        ("R", "Ом", ("Ω", "Ohm", "ohm"), "", "", "R", False),
+    )
+
+    # Значения с буквой вместо десятичной запятой: {буква: выражение}
+    decimalLetterRegexprs = {
+        row[5]: re.compile(r"^(\d*){}(\d+)$".format(re.escape(row[5])))
+        for row in valueUnits if row[5]
+    }
+
+    # Разобранные значения: {(буквенная часть, значение): результат parseValue}
+    _parsedValues = {}
+
+    # Разобранные шаблоны: {шаблон: результат compilePattern}
+    _compiledPatterns = {}
+
+    # Разобранные обозначения: {обозначение: результат parseReference}
+    _parsedReferences = {}
+
+    @staticmethod
+    def clearCaches():
+        """Очистить общие для всех компонентов сохранённые результаты.
+
+        Результаты parseReference, parseValue и compilePattern сохраняются
+        для всех компонентов сразу; чтобы они не накапливались между
+        построениями документов, их следует очищать при считывании схемы.
+
+        """
+        Component._parsedValues.clear()
+        Component._compiledPatterns.clear()
+        Component._parsedReferences.clear()
+
     def __init__(self, schematic):
         self.schematic = schematic
         self.reference = ""
@@ -26,6 +104,21 @@ class Component():
         self.datasheet = ""
         self.description = ""
         self.fields = {}
+        # Сохранённые результаты getIndexValue: {(name, singular, plural): value}
+        self._values = {}
+        # Сохранённый результат getSignature
+        self._signature = None
+
+    def resetValues(self):
+        """Сбросить сохранённые преобразованные значения.
+
+        Результаты getIndexValue вычисляются один раз и сохраняются.
+        После изменения данных компонента или настроек их необходимо
+        сбросить.
+
+        """
+        self._values.clear()
+        self._signature = None
 
     def getFieldValue(self, name):
         """Вернуть значение поля с указанным именем."""
@@ -33,12 +126,12 @@ class Component():
         if name == "Обозначение":
             value = self.reference
         elif name == "Значение":
-            if config.getboolean("doc", "add units"):
+            if self.schematic.options.doc.addUnits:
                 value = self.getValueWithUnits()
             else:
                 value = self.value
         elif name == "Посад.место":
-            if config.getboolean("doc", "footprint only"):
+            if self.schematic.options.doc.footprintOnly:
                 value = self.getFieldValue("Посад.место!")
             else:
                 value = self.footprint
@@ -57,23 +150,46 @@ class Component():
             value = self.formatPattern(value)
         return value
 
+    @staticmethod
+    def parseReference(ref):
+        """Разобрать обозначение.
+
+        Каждое обозначение разбирается один раз, результат сохраняется.
+
+        Аргументы:
+        ref (str) -- обозначение, например: "R7", "DA3A".
+
+        Возвращаемое значение -- кортеж (буквенная часть, номер (int),
+            остаток обозначения), например: ("DA", 3, "A");
+            None, если обозначение не соответствует REF_REGEXP.
+
+        """
+        if ref in Component._parsedReferences:
+            return Component._parsedReferences[ref]
+        match = REF_REGEXP.match(ref)
+        parsedRef = None
+        if match:
+            parsedRef = (match.group(1), int(match.group(2)), ref[match.end():])
+        Component._parsedReferences[ref] = parsedRef
+        return parsedRef
+
     def getRefType(self, ref=None):
         """Вернуть буквенную часть обозначения."""
         if ref is None:
             ref = self.reference
-        if not re.match(REF_REGEXP, ref):
+        parsedRef = Component.parseReference(ref)
+        if parsedRef is None:
             return None
-        refType = re.search(REF_REGEXP, ref).group(1)
-        return refType
+        return parsedRef[0]
 
     def getRefNumber(self, ref=None):
         """Вернуть цифровую часть обозначения."""
         if ref is None:
             ref = self.reference
-        if not re.match(REF_REGEXP, ref):
+        parsedRef = Component.parseReference(ref)
+        if parsedRef is None:
             return None
-        refNumber = re.search(REF_REGEXP, ref).group(2)
-        return int(refNumber)
+        return parsedRef[1]
 
     def _convertSingularPlural(self, value, singular, plural):
         """Привести переданное значение к единственному либо множественному числу.
@@ -115,6 +231,70 @@ class Component():
                             value = item[1]
         return value
 
+    def parseValue(self):
+        """Разобрать значение компонента.
+
+        Значение разбирается в соответствии с той строкой таблицы valueUnits,
+        с которой начинается буквенная часть обозначения компонента.
+        Результат сохраняется, поэтому одинаковые значения однотипных
+        компонентов разбираются только один раз.
+
+        Возвращаемое значение -- кортеж из четырёх значений:
+            (число (str, с десятичной точкой),
+             множитель на русском (для вывода),
+             единица измерения,
+             абсолютное значение (float)),
+            например: 2u7 -> ("2.7", "мк", "Ф", 2.7e-06),
+            100F -> ("100", "", "Ф", 1e-10);
+            None, если значение не удалось разобрать.
+
+        """
+        refType = self.getRefType() or ""
+        for prefix, units, suffixes, integer, decimal, decimalLetter, bareOnly \
+            in Component.valueUnits:
+            if refType.startswith(prefix):
+                break
+        else:
+            return None
+        key = (prefix, self.value)
+        if key in Component._parsedValues:
+            return Component._parsedValues[key]
+        value = self.value
+        for suffix in (units,) + suffixes:
+            while value.endswith(suffix):
+                value = value[:-len(suffix)]
+        value = value.strip()
+        number = None
+        match = None
+        displayMultiplier = None
+        if decimalLetter:
+            match = Component.decimalLetterRegexprs[decimalLetter].match(value)
+        if match:
+            number = (match.group(1) or "0") + '.' + match.group(2)
+            multiplier = ""
+        else:
+            match = Component.regexpr1.match(value)
+            if match:
+                number = match.group(1) + '.' + match.group(3)
+                multiplier = match.group(2)
+            else:
+                match = Component.regexpr2.match(value)
+                if match:
+                    number = match.group(1).replace(',', '.')
+                    multiplier = match.group(2)
+                    if multiplier is None:
+                        multiplier = decimal if '.' in number else integer
+                        if bareOnly and value != self.value:
+                            displayMultiplier = ""
+        parsed = None
+        if number is not None:
+            multiplier, factor = Component.valueMultipliers.get(multiplier, (multiplier, 1))
+            if displayMultiplier is None:
+                displayMultiplier = multiplier
+            parsed = (number, displayMultiplier, units, float(number) * factor)
+        Component._parsedValues[key] = parsed
+        return parsed
+
     def getValueWithUnits(self):
         """Преобразовать значение к стандартному виду.
 
@@ -123,103 +303,17 @@ class Component():
             2u7 -> 2,7 мкФ
 
         """
-        multipliersDict = {
-            'G': 'Г',
-            'M': 'М',
-            'k': 'к',
-            'm': 'м',
-            'μ': 'мк',
-            'u': 'мк',
-            'U': 'мк',
-            'n': 'н',
-            'p': 'п'
-        }
-        numValue = ""
+        parsed = self.parseValue()
+        if parsed is None:
+            return self.value
+        number, multiplier, units, _ = parsed
+        if self.value.endswith(units):
+            # Значение уже указано вместе с единицей измерения.
+            return self.value
         separator = ""
-        if config.getboolean("doc", "space before units"):
+        if self.schematic.options.doc.spaceBeforeUnits:
             separator = ' '
-        multiplier = ""
-        units = ""
-        multipliers = set(list(multipliersDict.keys()) + list(multipliersDict.values()))
-        # 2u7, 2н7, 4m7, 5k1 ...
-        regexpr1 = re.compile(
-            r"^(\d+)({})(\d+)$".format('|'.join(multipliers))
-        )
-        # 2.7 u, 2700p, 4.7 m, 470u, 5.1 k, 510 ...
-        regexpr2 = re.compile(
-            r"^(\d+(?:[\.,]\d+)?)\s*({})?$".format('|'.join(multipliers))
-        )
-        if self.getRefType().startswith('C') \
-            and not self.value.endswith('Ф'):
-                units = 'Ф'
-                if re.match(r"^\d+$", self.value):
-                    numValue = self.value
-                    multiplier = 'п'
-                elif re.match(r"^\d+[\.,]\d+$", self.value):
-                    numValue = self.value
-                    multiplier = "мк"
-                else:
-                    numValue = self.value.rstrip('F')
-                    numValue = numValue.strip()
-                    if re.match(regexpr1, numValue):
-                        searchRes = re.search(regexpr1, numValue).groups()
-                        numValue = "{},{}".format(searchRes[0], searchRes[2])
-                        multiplier = searchRes[1]
-                    elif re.match(regexpr2, numValue):
-                        searchRes = re.search(regexpr2, numValue).groups()
-                        numValue = searchRes[0]
-                        multiplier = searchRes[1]
-                    else:
-                        numValue = ""
-        elif self.getRefType().startswith('L') \
-            and not self.value.endswith("Гн"):
-                units = "Гн"
-                numValue = self.value.rstrip('H')
-                numValue = numValue.strip()
-                if re.match(regexpr1, numValue):
-                    searchRes = re.search(regexpr1, numValue).groups()
-                    numValue = "{},{}".format(searchRes[0], searchRes[2])
-                    multiplier = searchRes[1]
-                elif re.match(regexpr2, numValue):
-                    searchRes = re.search(regexpr2, numValue).groups()
-                    numValue = searchRes[0]
-                    if searchRes[1] is None:
-                        multiplier = "мк"
-                    else:
-                        multiplier = searchRes[1]
-                else:
-                    numValue = ""
-        elif self.getRefType().startswith('R') \
-            and not self.value.endswith("Ом"):
-                units = "Ом"
-                numValue = self.value.rstrip('Ω')
-                if numValue.endswith("Ohm") or numValue.endswith("ohm"):
-                    numValue = numValue[:-3]
-                numValue = numValue.strip()
-                if re.match(r"R\d+", numValue):
-                    numValue = numValue.replace('R', "0,")
-                elif re.match(r"\d+R\d+", numValue):
-                    numValue = numValue.replace('R', ',')
-                elif re.match(regexpr1, numValue):
-                    searchRes = re.search(regexpr1, numValue).groups()
-                    numValue = "{},{}".format(searchRes[0], searchRes[2])
-                    multiplier = searchRes[1]
-                elif re.match(regexpr2, numValue):
-                    searchRes = re.search(regexpr2, numValue).groups()
-                    numValue = searchRes[0]
-                    if searchRes[1] is not None:
-                        multiplier = searchRes[1]
-                else:
-                    numValue = ""
-        if numValue:
-            # Перевести множитель на русский
-            if multiplier in multipliersDict:
-                multiplier = multipliersDict[multiplier]
-            elif multiplier is None:
-                multiplier = ''
-            numValue = numValue.replace('.', ',')
-            return numValue + separator + multiplier + units
-        return self.value
+        return number.replace('.', ',') + separator + multiplier + units
 
     def formatPattern(self, pattern, check=False, singular=False, plural=False):
         """Преобразовать шаблон.
@@ -263,6 +357,49 @@ class Component():
         Возвращаемое значение (str) -- преобразованное значение.
 
         """
+        isPattern, ops = Component.compilePattern(pattern)
+        if check:
+            return isPattern
+        if not isPattern:
+            return pattern
+        out = []
+        for op in ops:
+            if isinstance(op, str):
+                out.append(op)
+                continue
+            prefix, fieldName, suffix = op
+            fieldValue = self.getFieldValue(fieldName)
+            if fieldValue:
+                fieldValue = self._convertSingularPlural(fieldValue, singular, plural)
+                out.append(prefix + fieldValue + suffix)
+        return "".join(out)
+
+    @staticmethod
+    def compilePattern(pattern):
+        """Разобрать шаблон.
+
+        Шаблон (см. formatPattern) разбирается один раз, результат
+        сохраняется и используется при последующих преобразованиях той же
+        строки для любых компонентов.
+
+        Результатом разбора является последовательность операций: строка --
+        текст, который выводится без изменений (в том числе конструкции ${}
+        неверного формата); кортеж (префикс, наименование поля, суффикс) --
+        подстановка значения поля.
+
+        Аргументы:
+        pattern (str) -- строка текста, которую следует обработать как шаблон.
+
+        Возвращаемое значение (tuple) -- кортеж из двух значений:
+            (True, если строка содержит хотя бы одну конструкцию ${},
+             кортеж операций).
+
+        """
+        compiled = Component._compiledPatterns.get(pattern)
+        if compiled is not None:
+            return compiled
+
+        ops = []
         out = ""
         prefix = ""
         fieldName = ""
@@ -324,12 +461,10 @@ class Component():
                             # (без префикса/суффикса).
                             fieldName = prefix
                             prefix = ""
-                        if check:
-                            return True
-                        fieldValue = self.getFieldValue(fieldName)
-                        if fieldValue:
-                            fieldValue = self._convertSingularPlural(fieldValue, singular, plural)
-                            out += prefix + fieldValue + suffix
+                        if out:
+                            ops.append(out)
+                            out = ""
+                        ops.append((prefix, fieldName, suffix))
                     substitution = temp = prefix = fieldName = suffix = ""
                 elif substitution == "prefix":
                     prefix += char
@@ -346,9 +481,32 @@ class Component():
         if substitution:
             # Конструкция ${} неожиданно закончилась.
             resetSubstitution()
-        if check:
-            return False
-        return out
+        if out:
+            ops.append(out)
+        isPattern = any(isinstance(op, tuple) for op in ops)
+        compiled = (isPattern, tuple(ops))
+        Component._compiledPatterns[pattern] = compiled
+        return compiled
+
+    def getSignature(self):
+        """Вернуть признаки, по которым компоненты считаются одинаковыми.
+
+        Одинаковые компоненты, идущие подряд, объединяются в одно множество
+        (см. CompRange).
+
+        Возвращаемое значение (tuple) -- буквенная часть обозначения, тип,
+            наименование, документ и примечание.
+
+        """
+        if self._signature is None:
+            self._signature = (
+                self.getRefType(),
+                self.getIndexValue("type"),
+                self.getIndexValue("name"),
+                self.getIndexValue("doc"),
+                self.getIndexValue("comment")
+            )
+        return self._signature
 
     def getIndexValue(self, name, singular=False, plural=False):
         """Вернуть преобразованное значение для перечня.
@@ -365,9 +523,12 @@ class Component():
         Возвращаемое значение (str) -- итоговое значение.
 
         """
+        key = (name, singular, plural)
+        if key in self._values:
+            return self._values[key]
         if name not in ("type", "name", "doc", "comment"):
             return ""
-        fieldName = config.get("fields", name)
+        fieldName = getattr(self.schematic.options.fields, config.attributeName(name))
         value = ""
         if self.formatPattern(fieldName, check=True):
             value = self.formatPattern(fieldName, singular=singular, plural=plural)
@@ -375,12 +536,13 @@ class Component():
             value = self.getFieldValue(fieldName)
             value = self._convertSingularPlural(value, singular, plural)
         if name == "name" and not value:
-            if config.getboolean("doc", "add units"):
+            if self.schematic.options.doc.addUnits:
                 value = self.getValueWithUnits()
             else:
                 value = self.value
         if value is None:
             value = ""
+        self._values[key] = value
         return value
 
 
@@ -396,6 +558,8 @@ class CompRange(Component):
     def __init__(self, schematic, comp=None):
         Component.__init__(self, schematic)
         self._refRange = []
+        # Сохранённый результат getRefRangeString
+        self._refRangeString = None
         if comp is not None:
             self._refRange.append(comp.reference)
             self.reference = comp.reference
@@ -404,6 +568,7 @@ class CompRange(Component):
             self.datasheet = comp.datasheet
             self.description = comp.description
             self.fields = comp.fields
+            self._values = comp._values
 
     def __iter__(self):
         for ref in self._refRange:
@@ -412,6 +577,16 @@ class CompRange(Component):
     def __len__(self):
         return len(self._refRange)
 
+    def extend(self, comps):
+        """Добавить компоненты, заведомо одинаковые с имеющимися.
+
+        Аргументы:
+        comps (iterable) -- компоненты, которые необходимо добавить.
+
+        """
+        self._refRange.extend(comp.reference for comp in comps)
+        self._refRangeString = None
+
     def append(self, comp):
         """Добавить новый компонент.
 
@@ -428,64 +603,63 @@ class CompRange(Component):
         if not self._refRange:
             self.__init__(self.schematic, comp)
             return True
-        if self.getRefType() == comp.getRefType() \
-            and self.getIndexValue("type") == comp.getIndexValue("type") \
-            and self.getIndexValue("name") == comp.getIndexValue("name") \
-            and self.getIndexValue("doc") == comp.getIndexValue("doc") \
-            and self.getIndexValue("comment") == comp.getIndexValue("comment"):
+        if self.getSignature() == comp.getSignature():
                 self._refRange.append(comp.reference)
+                self._refRangeString = None
                 return True
         return False
 
     def getRefRangeString(self):
         """Вернуть перечень обозначений множества одинаковых компонентов."""
-        refStr = ""
-        adjustable = False
-        adjustableField = config.get("fields", "adjustable")
+        if self._refRangeString is not None:
+            return self._refRangeString
+        mark = ""
+        adjustableField = self.schematic.options.fields.adjustable
         if self.getFieldValue(adjustableField) is not None:
-            adjustable = True
+            mark = '*'
         if len(self._refRange) > 1:
             # "VD1, VD2", "C8-C11", "R7, R9-R14", "C8*-C11*" ...
-            prevType = self.getRefType(self._refRange[0])
-            prevNumber = self.getRefNumber(self._refRange[0])
-            counter = 0
-            separator = ", "
-            refStr = prevType + str(prevNumber)
-            if adjustable:
-                refStr += '*'
-            for nextRef in self._refRange[1:]:
-                currentType = self.getRefType(nextRef)
-                currentNumber = self.getRefNumber(nextRef)
-                if currentType == prevType \
-                    and currentNumber == (prevNumber + 1):
-                        prevNumber = currentNumber
-                        counter += 1
-                        if counter > 1:
-                            separator = config.get("doc", "ref separator")
-                        continue
-                else:
-                    if counter > 0:
-                        refStr += separator + prevType + str(prevNumber)
-                        if adjustable:
-                            refStr += '*'
-                    separator = ', '
-                    refStr += separator + currentType + str(currentNumber)
-                    if adjustable:
-                        refStr += '*'
-                    prevType = currentType
-                    prevNumber = currentNumber
-                    counter = 0
-            if counter > 0:
-                refStr += separator + prevType + str(prevNumber)
-                if adjustable:
-                    refStr += '*'
+            parsedRefs = [Component.parseReference(ref) for ref in self._refRange]
+            refStr = self._joinRefRuns(parsedRefs, mark)
         else:
             # "R5"; "VT13" ...
-            refStr = self.reference
-            if adjustable:
-                refStr += '*'
+            refStr = self.reference + mark
+        self._refRangeString = refStr
         return refStr
 
+    def _joinRefRuns(self, parsedRefs, mark=""):
+        """Объединить обозначения в перечень.
+
+        Обозначения с одинаковой буквенной частью и номерами, идущими
+        подряд, объединяются: три и более -- через разделитель диапазона
+        (например: "C8-C11"), два -- через запятую ("VD1, VD2").
+
+        Аргументы:
+        parsedRefs (list) -- разобранные обозначения (см. parseReference)
+            в порядке перечисления;
+        mark (str) -- текст, добавляемый после каждого обозначения.
+
+        Возвращаемое значение (str) -- перечень обозначений.
+
+        """
+        # Серии обозначений: [буквенная часть, первый номер, последний номер]
+        runs = []
+        for refType, refNumber, _ in parsedRefs:
+            if runs and runs[-1][0] == refType and runs[-1][2] + 1 == refNumber:
+                runs[-1][2] = refNumber
+            else:
+                runs.append([refType, refNumber, refNumber])
+        separator = self.schematic.options.doc.refSeparator
+        parts = []
+        for refType, first, last in runs:
+            part = refType + str(first) + mark
+            if last - first == 1:
+                part += ", " + refType + str(last) + mark
+            elif last - first > 1:
+                part += separator + refType + str(last) + mark
+            parts.append(part)
+        return ", ".join(parts)
+
 
 class CompGroup():
     """Группа компонентов.
@@ -505,6 +679,8 @@ class CompGroup():
     def __init__(self, schematic, compRange=None):
         self.schematic = schematic
         self._compRanges = []
+        # Сохранённый результат getTitle
+        self._title = None
         if compRange is not None:
             self._compRanges.append(compRange)
 
@@ -531,12 +707,14 @@ class CompGroup():
         """
         if not self._compRanges:
             self._compRanges.append(compRange)
+            self._title = None
             return True
-        skipRefType = config.getboolean("doc", "concatenate same name groups")
+        skipRefType = self.schematic.options.doc.concatenateSameNameGroups
         lastCompRange = self._compRanges[-1]
         if (lastCompRange.getRefType() == compRange.getRefType() or skipRefType) \
             and lastCompRange.getIndexValue("type") == compRange.getIndexValue("type"):
                 self._compRanges.append(compRange)
+                self._title = None
                 return True
         return False
 
@@ -575,16 +753,24 @@ class CompGroup():
         Возвращаемое значение (list) -- список строк заголовка.
 
         """
+        if self._title is None:
+            self._title = self._buildTitle()
+        return list(self._title)
+
+    def _buildTitle(self):
+        """Сформировать заголовок группы компонентов (см. getTitle)."""
         if len(self) == 0:
             return []
 
         currentType = self._compRanges[0].getIndexValue("type", plural=True)
 
-        if not config.getboolean("doc", "title with doc"):
+        if not self.schematic.options.doc.titleWithDoc:
             return [currentType]
 
         # Список уникальных пар Наименование-Документ
         nameDocList = []
+        # Пары (Документ, сокращённое Наименование) из nameDocList
+        savedKeys = set()
         for compRange in self:
             currentName = compRange.getIndexValue("name")
             currentShortestName = self._shortenName(currentName)
@@ -593,28 +779,27 @@ class CompGroup():
                 # Если имеются компоненты, в которых документ не указан,
                 # то в заголовке для них будет указан только тип.
                 currentName = ""
-            for i in range(len(nameDocList)):
-                savedName = nameDocList[i][0]
-                savedShortestName = self._shortenName(savedName)
-                savedDoc = nameDocList[i][1]
-                if savedDoc == currentDoc \
-                        and savedShortestName == currentShortestName:
-                    break
-            else:
+            if (currentDoc, currentShortestName) not in savedKeys:
                 nameDocList.append([currentName, currentDoc])
+                savedKeys.add((currentDoc, self._shortenName(currentName)))
 
         # Максимально сократить наименования, оставив только часть
-        # достаточную для идентификации.
-        for i in range(len(nameDocList)):
-            name = nameDocList[i][0]
-            doc = nameDocList[i][1]
+        # достаточную для идентификации: первую часть, которая не совпадает
+        # ни с одной парой Наименование-Документ (с учётом уже сокращённых).
+        nameDocCounts = collections.Counter(
+            (name, doc) for name, doc in nameDocList
+        )
+        for nameDoc in nameDocList:
+            name, doc = nameDoc
             nameParts = re.findall(r"([-\s]?[^-\s]+)", name)
-            if len(nameParts) > 1:
-                for j in range(1, len(nameParts)):
-                    shortName = "".join(nameParts[:j])
-                    if [shortName, doc] not in nameDocList:
-                        nameDocList[i][0] = shortName
-                        break
+            shortName = ""
+            for namePart in nameParts[:-1]:
+                shortName += namePart
+                if not nameDocCounts[(shortName, doc)]:
+                    nameDocCounts[(name, doc)] -= 1
+                    nameDocCounts[(shortName, doc)] += 1
+                    nameDoc[0] = shortName
+                    break
 
         # Сформировать наименование
         if not nameDocList:
@@ -650,7 +835,12 @@ class CompGroup():
 class Schematic():
     """Данные о схеме и компонентах."""
 
-    def __init__(self, netlistName):
+    def __init__(self, netlistName, options=None):
+        # Параметры не меняются в процессе построения документа.
+        Component.clearCaches()
+        if options is None:
+            options = config.getSnapshot()
+        self.options = options
         self.title = ""
         self.number = ""
         self.company = ""
@@ -661,7 +851,7 @@ class Schematic():
         self.components = []
 
         self.typeNamesDict = {}
-        if config.getboolean("settings", "compatibility mode"):
+        if self.options.settings.compatibilityMode:
             # KB2S - kicadbom2spec
             settingsKB2S = config.loadFromKicadbom2spec()
             if settingsKB2S is not None:
@@ -672,69 +862,91 @@ class Schematic():
                             plural = settingsKB2S.get('group names plural', index)
                             self.typeNamesDict[singular] = plural
 
-        netlist = kicadnet.Netlist(netlistName)
-        for sheet in netlist.items("sheet"):
-            if sheet.attributes["name"] == "/":
-                title_block = netlist.find("title_block", sheet)
-                for item in title_block.items:
-                    if item.name == "title":
-                        self.title = item.text if item.text is not None else ""
-                    elif item.name == "company":
-                        self.company = item.text if item.text is not None else ""
-                    elif item.name == "comment":
-                        if item.attributes["number"] == "1":
-                            self.number = item.attributes["value"]
-                        elif item.attributes["number"] == "2":
-                            self.developer = item.attributes["value"]
-                        elif item.attributes["number"] == "3":
-                            self.verifier = item.attributes["value"]
-                        elif item.attributes["number"] == "4":
-                            self.approver = item.attributes["value"]
-                        elif item.attributes["number"] == "6":
-                            self.inspector = item.attributes["value"]
-                break
-        for comp in netlist.items("comp"):
+        if netlistName.endswith((".kicad_sch", ".sch")):
+            # Данные считываются непосредственно из файлов схемы (KiCad 6 и
+            # новее или KiCad 5), без экспорта списка цепей.
+            kicadSchematic = kicadsch.KicadSchematic(netlistName)
+            titleBlock = kicadSchematic.titleBlock
+            self.title = titleBlock.get("title", "")
+            self.company = titleBlock.get("company", "")
+            self.number = titleBlock.get("comment 1", "")
+            self.developer = titleBlock.get("comment 2", "")
+            self.verifier = titleBlock.get("comment 3", "")
+            self.approver = titleBlock.get("comment 4", "")
+            self.inspector = titleBlock.get("comment 6", "")
+            records = kicadSchematic.components
+        else:
+            cache = None
+            if self.options.settings.netlistCache:
+                cache = kicadnet.NetlistCache()
+            interpreter = None
+            if self.options.settings.parseInSeparateProcess:
+                interpreter = self.options.settings.pythonInterpreter \
+                    or kicadnet.findInterpreter()
+            netlist = kicadnet.Netlist(
+                netlistName,
+                sections=("design",),
+                components=True,
+                cache=cache,
+                interpreter=interpreter
+            )
+            for sheet in netlist.items("sheet"):
+                if sheet.attributes["name"] == "/":
+                    title_block = netlist.find("title_block", sheet)
+                    for item in title_block.items:
+                        if item.name == "title":
+                            self.title = item.text if item.text is not None else ""
+                        elif item.name == "company":
+                            self.company = item.text if item.text is not None else ""
+                        elif item.name == "comment":
+                            if item.attributes["number"] == "1":
+                                self.number = item.attributes["value"]
+                            elif item.attributes["number"] == "2":
+                                self.developer = item.attributes["value"]
+                            elif item.attributes["number"] == "3":
+                                self.verifier = item.attributes["value"]
+                            elif item.attributes["number"] == "4":
+                                self.approver = item.attributes["value"]
+                            elif item.attributes["number"] == "6":
+                                self.inspector = item.attributes["value"]
+                    break
+            records = netlist.components
+        for record in records:
             component = Component(self)
-            component.reference = comp.attributes["ref"]
-            for item in comp.items:
-                if item.name == "value":
-                    component.value = item.text if item.text is not None and item.text != "~" else ""
-                elif item.name == "footprint":
-                    component.footprint = item.text if item.text is not None and item.text != "~" else ""
-                elif item.name == "datasheet":
-                    component.datasheet = item.text if item.text is not None and item.text != "~" else ""
-                elif item.name == "libsource":
-                    if "description" in item.attributes:
-                        component.description = item.attributes["description"]
-                elif item.name == "fields":
-                    for field in item.items:
-                        fieldName = field.attributes["name"]
-                        component.fields[fieldName] = field.text if field.text is not None and field.text != "~" else ""
+            component.reference = record.reference
+            if record.value is not None and record.value != "~":
+                component.value = record.value
+            if record.footprint is not None and record.footprint != "~":
+                component.footprint = record.footprint
+            if record.datasheet is not None and record.datasheet != "~":
+                component.datasheet = record.datasheet
+            if record.description is not None:
+                component.description = record.description
+            for fieldName, fieldValue in record.fields.items():
+                component.fields[fieldName] = fieldValue if fieldValue is not None and fieldValue != "~" else ""
             self.components.append(component)
 
     def getGroupedComponents(self):
         """Вернуть компоненты, сгруппированные по обозначению и типу."""
+        for comp in self.components:
+            comp.resetValues()
         sortedComponents = sorted(
             self.components,
-            key=lambda comp: comp.getRefNumber()
-        )
-        sortedComponents = sorted(
-            sortedComponents,
-            key=lambda comp: comp.getRefType()
+            key=lambda comp: (comp.getRefType(), comp.getRefNumber())
         )
+        excludedField = self.options.fields.excluded
+        if excludedField:
+            sortedComponents = [
+                comp for comp in sortedComponents
+                if excludedField not in comp.fields
+            ]
         groups = []
         compGroup = CompGroup(self)
-        compRange = CompRange(self)
-        excludedField = config.get("fields", "excluded")
-        for comp in sortedComponents:
-            if excludedField and excludedField in comp.fields:
-                continue
-            if not compRange.append(comp):
-                if not compGroup.append(compRange):
-                    groups.append(compGroup)
-                    compGroup = CompGroup(self, compRange)
-                compRange = CompRange(self, comp)
-        if len(compRange) > 0:
+        # Одинаковые компоненты, идущие подряд, образуют одно множество.
+        runs = itertools.groupby(sortedComponents, key=lambda comp: comp.getSignature())
+        for _, sameComponents in runs:
+            compRange = CompRange(self, next(sameComponents))
+            compRange.extend(sameComponents)
             if not compGroup.append(compRange):
                 groups.append(compGroup)
                 compGroup = CompGroup(self, compRange)
@@ -1,6 +1,201 @@
 """Объектное представление списка цепей KiCad."""
 
+import array
+import bisect
+import collections
+import gc
+import gzip
+import hashlib
 import html
+import json
+import marshal
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import types
+from xml.parsers import expat
+
+try:
+    import lzma
+except ImportError:
+    # Сборка Python без поддержки xz
+    lzma = None
+
+# Значение в формате S-выражений: в кавычках или без. Как и при
+# посимвольном разборе, кавычка заканчивает значение, только если перед ней
+# нет символа '\\' (поэтому значение "a\\" не заканчивается второй
+# кавычкой); имена элементов могут содержать кавычки.
+_NET_QUOTED = r'"[^"\\\n]*(?:\\(?:"|(?!"))[^"\\\n]*)*"'
+_NET_BARE = r'[^ ()\n"][^ ()\n]*'
+
+# Простой элемент (без вложенных элементов), например: (ref R1)
+_NET_SIMPLE_ITEM = r'\([^ ()\n]+(?: (?:{}|{}))?\)'.format(_NET_QUOTED, _NET_BARE)
+
+# Лексемы списка цепей в формате S-выражений (*.net).
+# Номер последней сработавшей группы определяет вид лексемы.
+# Чтобы сократить количество лексем, начало элемента выделяется одной
+# лексемой вместе со следующими за ним в той же строке простыми элементами,
+# значением, закрывающими скобками и переводом строки, например:
+# (field (name Тип) "Резистор {Резисторы}"))
+_NET_TOKENS = re.compile(
+    r' *(?:'
+    r'\(([^ ()\n]+)'                          # 1 - начало элемента (имя),
+    r'((?: {2})*)'                            # 2 - простые элементы,
+    r'(?: (?:({0})|({1})))?'                  # 3, 4 - значение,
+    r'(\)*)'                                  # 5 - закрывающие скобки,
+    r'(\n)?'                                  # 6 - перевод строки
+    r'|\(([^ ()\n]*)'                         # 7 - начало элемента (имя)
+    r'|(\))'                                  # 8 - конец элемента
+    r'|(\n)'                                  # 9 - перевод строки
+    r'|({0})'                                 # 10 - значение в кавычках
+    r'|({1})'                                 # 11 - значение без кавычек
+    r'|(")'                                   # 12 - незакрытая кавычка
+    r')'.format(_NET_QUOTED, _NET_BARE, _NET_SIMPLE_ITEM)
+)
+
+# Простые элементы в виде пар (имя, значение).
+_NET_SIMPLE_ITEMS = re.compile(
+    r'\(([^ ()\n]+)(?: ({}|{}))?\)'.format(_NET_QUOTED, _NET_BARE)
+)
+
+# Значение в кавычках (для удаления из текста перед подсчётом скобок).
+_NET_QUOTED_TEXT = re.compile(_NET_QUOTED)
+
+# Пропуск содержимого элемента без разбора: всё, что не меняет уровень
+# вложенности, пропускается целиком; группа 1 -- следующий символ,
+# меняющий уровень вложенности ('(' или ')'), незакрытая кавычка или
+# пустая строка в конце содержимого.
+_NET_SKIP = re.compile(r'(?:[^()"]+|{})*([()"]?)'.format(_NET_QUOTED))
+
+# Размер блока, считываемого из файла за один раз (в байтах).
+_NET_CHUNK_SIZE = 1 << 20
+
+# Начало элемента XML.
+_XML_START_TAG = re.compile(rb'<([^\s/>!?]+)[^>]*>')
+
+# Начало раздела XML (элемента верхнего уровня).
+_XML_SECTION = re.compile(rb'\s*<([^\s/>!?]+)')
+
+# Запись о компоненте схемы, извлечённая из раздела components без
+# построения дерева элементов. Значения указаны так, как они записаны в
+# списке цепей (None -- если значение отсутствует); fields -- словарь
+# ("имя поля": "значение").
+ComponentRecord = collections.namedtuple(
+    "ComponentRecord",
+    ("reference", "value", "footprint", "datasheet", "description", "fields")
+)
+
+
+# Функции открытия сжатых файлов списков цепей (по расширению).
+_COMPRESSED = {".gz": gzip.open}
+if lzma is not None:
+    _COMPRESSED[".xz"] = lzma.open
+
+# Команда запуска разбора в отдельном процессе: первый аргумент -- каталог
+# модуля (может находиться внутри документа -- модуль импортируется из
+# zip-архива).
+_WORKER_SCRIPT = (
+    "import sys; sys.path.insert(0, sys.argv[1]); "
+    "import kicadnet; kicadnet._runWorker()"
+)
+
+# Наибольшее время разбора в отдельном процессе (в секундах): если процесс
+# не завершился за это время (например, завис), он принудительно завершается
+# и файл разбирается в текущем процессе.
+_WORKER_TIMEOUT = 60
+
+# Общие неизменяемые пустые атрибуты и дочерние элементы -- заменяются
+# собственными объектами элемента при первом обращении к ним.
+_EMPTY_ATTRIBUTES = types.MappingProxyType({})
+_EMPTY_ITEMS = ()
+
+def _splitCompression(fileName):
+    """Определить, сжат ли файл списка цепей.
+
+    Аргументы:
+    fileName (str) -- имя файла, например: "project.net.gz".
+
+    Возвращаемое значение (tuple) -- имя файла без расширения сжатого файла
+    (например: "project.net") и функция открытия файла (open -- для
+    несжатых файлов). Сжатые файлы распаковываются по мере чтения.
+
+    """
+    name, extension = os.path.splitext(fileName)
+    opener = _COMPRESSED.get(extension.lower())
+    if opener is None:
+        return fileName, open
+    return name, opener
+
+def findInterpreter():
+    """Найти интерпретатор Python для разбора в отдельном процессе.
+
+    Возвращаемое значение (str) -- полное имя исполняемого файла
+    интерпретатора Python, установленного в системе (None -- если не
+    найден). Интерпретатор, встроенный в LibreOffice, для запуска отдельного
+    процесса не годится.
+
+    """
+    for name in ("python3", "python"):
+        interpreter = shutil.which(name)
+        if interpreter is not None:
+            return interpreter
+    return None
+
+def _runWorker():
+    """Разобрать список цепей в отдельном процессе.
+
+    Параметры разбора (JSON) считываются со стандартного ввода; в
+    стандартный вывод записывается (JSON) компактное представление
+    результатов разбора или сведения об ошибке разбора.
+
+    """
+    request = json.loads(sys.stdin.buffer.read().decode("utf-8"))
+    try:
+        netlist = Netlist(
+            request["fileName"],
+            legacy=request["legacy"],
+            sections=request["sections"],
+            components=request["components"]
+        )
+        response = ["ok", netlist._getCachedData()]
+    except ParseException as error:
+        response = ["error", error.line, error.pos, error.message]
+    sys.stdout.buffer.write(
+        json.dumps(response, ensure_ascii=False).encode("utf-8")
+    )
+
+def _unquoteNetText(text):
+    """Удалить кавычки и экранирование из значения в формате S-выражений."""
+    text = text[1:-1]
+    if '\\' in text:
+        text = text.replace("\\\"", "\"")
+        text = text.replace("\\\\", "\\")
+    return text
+
+
+def _parseNetAttributes(text):
+    """Разобрать строку простых элементов в словарь атрибутов.
+
+    Аргументы:
+    text (str) -- простые элементы в формате S-выражений, например:
+        "(name Тип) (value 10k)".
+
+    Возвращаемое значение (dict of str) -- словарь атрибутов.
+
+    """
+    attributes = {
+        sys.intern(name): value for name, value in _NET_SIMPLE_ITEMS.findall(text)
+    }
+    if '"' in text or "" in attributes.values():
+        for name, value in attributes.items():
+            if not value:
+                attributes[name] = None
+            elif value[0] == '"':
+                attributes[name] = _unquoteNetText(value)
+    return attributes
 
 
 class ParseException(Exception):
@@ -8,6 +203,9 @@ class ParseException(Exception):
 
     def __init__(self, line, pos, message):
         Exception.__init__(self)
+        self.line = line
+        self.pos = pos
+        self.message = message
         self.value = "Строка {}, позиция {}:\n{}".format(
             line,
             pos,
@@ -18,9 +216,72 @@ class ParseException(Exception):
         return self.value
 
 
+class _DigestReader():
+    """Файл, для содержимого которого по мере чтения вычисляется хэш.
+
+    Позволяет получить хэш содержимого файла списка цепей, не считывая файл
+    повторно после разбора: учитывается каждый байт файла, считанный
+    впервые. Повторное чтение (после перехода назад) на хэш не влияет; если
+    часть файла пропущена переходом вперёд -- хэш не вычисляется.
+
+    """
+
+    def __init__(self, source):
+        """Аргументы:
+        source -- файл, открытый для чтения в двоичном режиме.
+
+        """
+        self._source = source
+        self._digest = hashlib.sha256()
+        self._position = source.tell()
+        self._hashed = self._position
+
+    def read(self, size=-1):
+        data = self._source.read(size)
+        end = self._position + len(data)
+        if self._digest is not None and end > self._hashed:
+            if self._position == self._hashed:
+                self._digest.update(data)
+            else:
+                self._digest.update(
+                    memoryview(data)[self._hashed - self._position:]
+                )
+            self._hashed = end
+        self._position = end
+        return data
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        self._position = self._source.seek(offset, whence)
+        if self._position > self._hashed:
+            self._digest = None
+        return self._position
+
+    def tell(self):
+        return self._position
+
+    def seekable(self):
+        return self._source.seekable()
+
+    def getDigest(self):
+        """Дочитать файл и вернуть хэш (SHA-256) его содержимого.
+
+        Возвращаемое значение (bytes) -- хэш содержимого файла (None -- если
+        часть файла была пропущена).
+
+        """
+        if self._digest is None:
+            return None
+        self.seek(self._hashed)
+        while self.read(_NET_CHUNK_SIZE):
+            pass
+        return self._digest.digest()
+
+
 class NetlistItem():
     """Элемент списка цепей."""
 
+    __slots__ = ("parent", "name", "_attributes", "_items", "text")
+
     def __init__(self, parent, name, attributes=None, items=None, text=None):
         """Создать элемент списка цепей.
 
@@ -34,58 +295,508 @@ class NetlistItem():
         Аргументы:
         parent (NetlistItem) -- родительский элемент;
         name (str) -- имя элемента;
-        attributes (dict of str) -- словарь атрибутов ("имя": "значение");
+        attributes (dict of str) -- словарь атрибутов ("имя": "значение")
+            или строка простых элементов в формате S-выражений, например:
+            "(name Тип) (value 10k)" (будет разобрана при первом обращении
+            к атрибутам);
         items (list of NetlistItem) -- массив дочерних элементов;
         text (str) -- текстовое значение элемента.
 
+        Пока атрибуты или дочерние элементы не заданы, элемент ссылается на
+        общие пустые объекты; собственные словарь и массив создаются при
+        первом обращении к ним. Имена элементов хранятся в единственном
+        экземпляре (sys.intern).
+
         """
         self.parent = parent
-        self.name = name
-        self.attributes = {} if attributes is None else attributes
-        self.items = [] if items is None else items
+        self.name = sys.intern(name)
+        self._attributes = _EMPTY_ATTRIBUTES if attributes is None else attributes
+        self._items = _EMPTY_ITEMS if items is None else items
         self.text = text
 
+    @property
+    def attributes(self):
+        """Словарь атрибутов ("имя": "значение")."""
+        attributes = self._attributes
+        if attributes is _EMPTY_ATTRIBUTES:
+            self._attributes = attributes = {}
+        elif attributes.__class__ is str:
+            self._attributes = attributes = _parseNetAttributes(attributes)
+        return attributes
+
+    @attributes.setter
+    def attributes(self, attributes):
+        self._attributes = attributes
+
+    @property
+    def items(self):
+        """Массив дочерних элементов."""
+        items = self._items
+        if items is _EMPTY_ITEMS:
+            self._items = items = []
+        return items
+
+    @items.setter
+    def items(self, items):
+        self._items = items
+
+
+class NetlistCache():
+    """Кэш результатов разбора списков цепей на диске.
+
+    Для каждого файла списка цепей (и набора параметров разбора) хранится
+    файл с компактным представлением результатов разбора. Сохранённые
+    результаты действительны, если совпадают размер и время изменения файла
+    списка цепей, либо -- если время изменения другое (список цепей создан
+    заново) -- хэш его содержимого. Хэш вычисляется по мере разбора, файл
+    для этого повторно не считывается. Общий размер кэша ограничен: при
+    превышении удаляются файлы, которые дольше всего не использовались.
+
+    """
+
+    # Признак формата файлов кэша (учитывает версию Python, так как от неё
+    # зависит формат marshal).
+    HEADER = ("kicadnet", 1, marshal.version, tuple(sys.version_info[:2]))
+
+    def __init__(self, directory=None, maxSize=32 << 20):
+        """Создать кэш.
+
+        Аргументы:
+        directory (str) -- каталог кэша (по умолчанию -- каталог кэша
+            пользователя, см. getDefaultDirectory()). Если каталог не
+            определён -- кэш не используется;
+        maxSize (int) -- наибольший общий размер файлов кэша в байтах.
+
+        """
+        if directory is None:
+            directory = self.getDefaultDirectory()
+        self.directory = directory
+        self.maxSize = maxSize
+
+    @staticmethod
+    def getDefaultDirectory():
+        """Вернуть каталог кэша пользователя.
+
+        Возвращаемое значение (str) -- полное имя каталога (None -- если
+        каталог кэша пользователя не удалось определить).
+
+        """
+        if sys.platform == "win32":
+            base = os.environ.get("LOCALAPPDATA") \
+                or os.environ.get("APPDATA")
+        else:
+            base = os.environ.get("XDG_CACHE_HOME")
+            if not base:
+                home = os.path.expanduser("~")
+                if home != "~":
+                    base = os.path.join(home, ".cache")
+        if not base:
+            return None
+        return os.path.join(base, "kicadnet")
+
+    def _getEntryName(self, fileName, options):
+        key = repr((os.path.abspath(fileName), options))
+        key = hashlib.sha1(key.encode("utf-8", "surrogatepass")).hexdigest()
+        return os.path.join(self.directory, key + ".cache")
+
+    @staticmethod
+    def _getDigest(fileName):
+        digest = hashlib.sha256()
+        with open(fileName, "rb") as netlist:
+            while True:
+                block = netlist.read(_NET_CHUNK_SIZE)
+                if not block:
+                    break
+                digest.update(block)
+        return digest.digest()
+
+    def _write(self, entryName, entry):
+        # Файл записывается под временным именем и затем переименовывается,
+        # чтобы другой процесс не прочитал его частично записанным.
+        handle, tempName = tempfile.mkstemp(".tmp", dir=self.directory)
+        try:
+            with os.fdopen(handle, "wb") as entryFile:
+                marshal.dump(entry, entryFile)
+            os.replace(tempName, entryName)
+        except (OSError, ValueError):
+            os.remove(tempName)
+            raise
+
+    def load(self, fileName, options):
+        """Вернуть сохранённые результаты разбора или None, если их нет.
+
+        Аргументы:
+        fileName (str) -- полное имя файла списка цепей;
+        options (tuple) -- параметры разбора.
+
+        """
+        try:
+            status = os.stat(fileName)
+            entryName = self._getEntryName(fileName, options)
+            with open(entryName, "rb") as entryFile:
+                header, size, mtime, digest, data = marshal.load(entryFile)
+            if header != self.HEADER or size != status.st_size:
+                return None
+            if mtime != status.st_mtime_ns:
+                if digest != self._getDigest(fileName):
+                    return None
+                self._write(
+                    entryName,
+                    (header, size, status.st_mtime_ns, digest, data)
+                )
+            else:
+                # Отметить использование (для удаления давно не
+                # использовавшихся файлов).
+                os.utime(entryName)
+            return data
+        except (OSError, ValueError, EOFError, TypeError):
+            return None
+
+    def store(self, fileName, options, status, data, digest=None):
+        """Сохранить результаты разбора.
+
+        Аргументы:
+        fileName (str) -- полное имя файла списка цепей;
+        options (tuple) -- параметры разбора;
+        status (os.stat_result) -- состояние файла списка цепей перед
+            разбором (если файл изменился во время разбора -- результаты
+            не сохраняются);
+        data -- результаты разбора (значение, допускающее marshal);
+        digest (bytes) -- хэш содержимого файла, вычисленный при разборе
+            (None -- вычислить, считав файл).
+
+        """
+        try:
+            if digest is None:
+                digest = self._getDigest(fileName)
+            current = os.stat(fileName)
+            if (current.st_size, current.st_mtime_ns) \
+                != (status.st_size, status.st_mtime_ns):
+                    return
+            os.makedirs(self.directory, exist_ok=True)
+            self._write(
+                self._getEntryName(fileName, options),
+                (self.HEADER, status.st_size, status.st_mtime_ns, digest, data)
+            )
+            self._evict()
+        except (OSError, ValueError):
+            pass
+
+    def _evict(self):
+        """Удалить давно не использовавшиеся файлы сверх допустимого размера."""
+        entries = []
+        total = 0
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".cache") and entry.is_file():
+                status = entry.stat()
+                entries.append((status.st_mtime_ns, status.st_size, entry.path))
+                total += status.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.maxSize:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
 
 class Netlist():
     """Список цепей."""
 
-    def __init__(self, fileName):
+    def __init__(self, fileName, legacy=False, sections=None, components=False,
+                 cache=None, interpreter=None):
         """Считать список цепей.
 
         Загрузить содержимое файла списка цепей KiCad (*.net, *.xml)
-        и построить его объектное представление.
+        и построить его объектное представление. Файл может быть сжат
+        (*.net.gz, *.xml.gz, *.net.xz, *.xml.xz) -- он распаковывается по
+        мере разбора. Мнемоники XML (&amp;, &lt;, &#1046; и т.п.) в значениях
+        атрибутов и элементов раскрываются при любом способе разбора, а при
+        записи в файл (см. save()) снова экранируются.
+
+        Аргументы:
+        fileName (str) -- полное имя файла списка цепей;
+        legacy (bool) -- использовать прежний посимвольный разбор вместо
+            разбора по лексемам (*.net) и потокового разбора (*.xml);
+        sections (iterable of str) -- имена разделов (элементов верхнего
+            уровня, например: "design", "components"), которые требуется
+            считать; остальные разделы пропускаются без разбора и в
+            объектное представление не попадают. Если не указано --
+            считываются все разделы;
+        components (bool) -- извлечь записи о компонентах из раздела
+            components напрямую, не создавая для него элементы списка цепей
+            (в объектное представление раздел не попадает);
+        cache (NetlistCache) -- кэш результатов разбора на диске: если для
+            файла списка цепей (и тех же параметров sections и components)
+            имеются сохранённые результаты -- файл не разбирается (None или
+            кэш без каталога -- не использовать кэш);
+        interpreter (str) -- полное имя исполняемого файла интерпретатора
+            Python (см. findInterpreter()) для разбора в отдельном процессе:
+            в текущий процесс передаётся только компактное представление
+            результатов разбора. Если процесс не удалось запустить, он
+            завершился неудачно или не завершился за _WORKER_TIMEOUT секунд
+            -- файл разбирается в текущем процессе (None -- всегда разбирать
+            в текущем процессе).
 
         Атрибуты:
         fileName (str) -- полное имя файла списка цепей.
         data (NetlistItem) -- объектное представление списка цепей.
+        components (list of ComponentRecord) -- записи о компонентах (если
+            они не запрашивались -- None).
 
         """
         self.fileName = fileName
         self.data = None
+        self.components = [] if components else None
+        self._nameIndex = None
         self._reset()
-        with open(fileName, encoding="utf-8") as netlist:
-            if self.fileName.endswith(".net"):
-                self._content = netlist.read()
-                self.data = self._parseNetItem(None)
-                self._reset()
-            elif self.fileName.endswith(".xml"):
-                netlist.readline() # Пропустить первую строку (заголовок)
-                self._content = netlist.read()
-                self.data = self._parseXmlItem(None)
-                self._reset()
-            else:
-                self._error("Формат файла не поддерживается.")
+        if sections is not None:
+            sections = frozenset(sections)
+        if cache is None or cache.directory is None:
+            self._parse(legacy, sections, components, interpreter)
+            return
+        options = (
+            None if sections is None else tuple(sorted(sections)),
+            bool(components)
+        )
+        cached = cache.load(fileName, options)
+        if cached is not None:
+            self._setCachedData(cached)
+            return
+        status = os.stat(fileName)
+        digest = self._parse(legacy, sections, components, interpreter, True)
+        cache.store(fileName, options, status, self._getCachedData(), digest)
+
+    def _parse(self, legacy, sections, components, interpreter, hashed=False):
+        """Разобрать файл списка цепей в отдельном процессе или в текущем.
+
+        Возвращаемое значение (bytes) -- хэш содержимого файла, если он
+        запрошен (hashed) и вычислен при разборе, иначе None.
+
+        """
+        if interpreter is not None:
+            if self._parseInWorker(interpreter, legacy, sections, components):
+                return None
+        return self._parseFile(legacy, sections, components, hashed)
+
+    def _parseInWorker(self, interpreter, legacy, sections, components):
+        """Разобрать файл списка цепей в отдельном процессе.
+
+        Возвращаемое значение (bool) -- True, если файл разобран (False --
+        процесс не удалось запустить, он не завершился за _WORKER_TIMEOUT
+        секунд или от него не удалось получить результаты).
+
+        """
+        request = {
+            "fileName": os.path.abspath(self.fileName),
+            "legacy": bool(legacy),
+            "sections": None if sections is None else sorted(sections),
+            "components": bool(components)
+        }
+        command = [
+            interpreter,
+            "-E", # Не учитывать PYTHONHOME и PYTHONPATH окружения LibreOffice
+            "-c", _WORKER_SCRIPT,
+            os.path.dirname(os.path.abspath(__file__))
+        ]
+        flags = 0
+        if sys.platform == "win32":
+            flags = subprocess.CREATE_NO_WINDOW
+        try:
+            result = subprocess.run(
+                command,
+                input=json.dumps(request).encode("utf-8"),
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                creationflags=flags,
+                timeout=_WORKER_TIMEOUT,
+                check=True
+            )
+            response = json.loads(result.stdout.decode("utf-8"))
+        except (OSError, ValueError, subprocess.SubprocessError):
+            # В том числе subprocess.TimeoutExpired -- процесс при этом уже
+            # принудительно завершён.
+            return False
+        if response[0] == "error":
+            raise ParseException(*response[1:])
+        self._setCachedData(response[1])
+        return True
+
+    def _parseFile(self, legacy, sections, components, hashed=False):
+        """Разобрать файл списка цепей.
+
+        Аргументы legacy, sections и components -- как у конструктора;
+        hashed (bool) -- вычислить при разборе хэш содержимого файла (для
+        кэша, только при разборе по лексемам и потоковом разборе).
+
+        Возвращаемое значение (bytes) -- хэш содержимого файла (None -- если
+        не вычислялся).
+
+        """
+        fileName, opener = _splitCompression(self.fileName)
+        if legacy:
+            with opener(self.fileName, "rt", encoding="utf-8") as netlist:
+                if fileName.endswith(".net"):
+                    self._content = netlist.read()
+                    self.data = self._parseNetItem(None)
+                    self._reset()
+                elif fileName.endswith(".xml"):
+                    netlist.readline() # Пропустить первую строку (заголовок)
+                    self._content = netlist.read()
+                    self.data = self._parseXmlItem(None)
+                    self._reset()
+                else:
+                    self._error("Формат файла не поддерживается.")
+            if self.data is not None and components:
+                for item in self.data.items:
+                    if item.name == "components":
+                        self.components.extend(self._getComponentRecords(item))
+                self.data.items = [
+                    item for item in self.data.items if item.name != "components"
+                ]
+            if self.data is not None and sections is not None:
+                self.data.items = [
+                    item for item in self.data.items if item.name in sections
+                ]
+            return None
+        if not fileName.endswith((".net", ".xml")):
+            self._error("Формат файла не поддерживается.")
+        # При разборе создаётся множество объектов, но мусор с циклическими
+        # ссылками не образуется -- сборщик мусора лишь замедлил бы разбор.
+        gcEnabled = gc.isenabled()
+        gc.disable()
+        try:
+            with open(self.fileName, "rb") as source:
+                reader = _DigestReader(source) if hashed else source
+                netlist = reader if opener is open else opener(reader, "rb")
+                try:
+                    if fileName.endswith(".net"):
+                        self._file = netlist
+                        items = self._parseNetContent(sections, self.components)
+                    else:
+                        items = self._parseXmlFile(
+                            netlist,
+                            sections,
+                            self.components
+                        )
+                    for item in items:
+                        if self.data is None:
+                            self.data = item
+                        else:
+                            self.data.items.append(item)
+                finally:
+                    self._reset()
+                    if netlist is not reader:
+                        netlist.close()
+                if hashed:
+                    return reader.getDigest()
+                return None
+        finally:
+            if gcEnabled:
+                gc.enable()
+
+    def _getCachedData(self):
+        """Вернуть компактное представление результатов разбора для кэша.
+
+        Возвращаемое значение (tuple) -- элементы в порядке следования в
+        файле в виде кортежей (номер родительского элемента или -1, имя,
+        атрибуты, значение) и записи о компонентах в виде кортежей (или
+        None, если они не запрашивались).
+
+        """
+        items = []
+        if self.data is not None:
+            stack = [(self.data, -1)]
+            while stack:
+                item, parent = stack.pop()
+                number = len(items)
+                items.append((parent, item.name, item._attributes or None, item.text))
+                for subitem in reversed(item._items):
+                    stack.append((subitem, number))
+        records = None
+        if self.components is not None:
+            records = [tuple(record) for record in self.components]
+        return (items, records)
+
+    def _setCachedData(self, cached):
+        """Восстановить результаты разбора из представления для кэша."""
+        items, records = cached
+        created = []
+        # Как и при разборе, сборщик мусора лишь замедлил бы создание
+        # множества элементов.
+        gcEnabled = gc.isenabled()
+        gc.disable()
+        try:
+            for parent, name, attributes, text in items:
+                parent = created[parent] if parent >= 0 else None
+                item = NetlistItem(parent, name, attributes, None, text)
+                if parent is not None:
+                    parent.items.append(item)
+                created.append(item)
+        finally:
+            if gcEnabled:
+                gc.enable()
+        self.data = created[0] if created else None
+        if records is not None:
+            self.components = [ComponentRecord(*record) for record in records]
+
+    @staticmethod
+    def _getComponentRecords(section):
+        """Вернуть записи о компонентах из элемента раздела components."""
+        records = []
+        for comp in section.items:
+            if comp.name != "comp":
+                continue
+            values = {"value": None, "footprint": None, "datasheet": None}
+            description = None
+            fields = {}
+            for item in comp.items:
+                if item.name in values:
+                    values[item.name] = item.text
+                elif item.name == "libsource":
+                    if "description" in item.attributes:
+                        description = item.attributes["description"]
+                elif item.name == "fields":
+                    for field in item.items:
+                        fields[field.attributes["name"]] = field.text
+            records.append(ComponentRecord(
+                comp.attributes["ref"],
+                values["value"],
+                values["footprint"],
+                values["datasheet"],
+                description,
+                fields
+            ))
+        return records
 
     def _reset(self):
         self._content = ""
         self._index = 0
-        self._line = 1
-        self._pos = 1
+        self._file = None
+        self._carry = b""
+        self._lineBase = 0
+        self._fileOffset = 0
+        self._checkpoints = []
 
     def _error(self, message):
+        self._errorAt(self._index, message)
+
+    def _errorAt(self, index, message):
+        """Сообщить об ошибке в указанной позиции текущей части содержимого.
+
+        Номер строки и позиция в строке вычисляются только в момент
+        возникновения ошибки: по смещениям символов перевода строки
+        (двоичным поиском) -- при разборе отслеживается лишь позиция.
+
+        """
+        newlines = [match.start() for match in re.finditer('\n', self._content)]
+        line = bisect.bisect_left(newlines, index)
+        lineStart = newlines[line - 1] + 1 if line else 0
         raise ParseException(
-            self._line,
-            self._pos,
+            self._lineBase + line + 1,
+            index - lineStart + 1,
             message
         )
 
@@ -96,13 +807,7 @@ class Netlist():
         return self._content[self._index + offset]
 
     def _nextChar(self, offset=1):
-        if offset > 1:
-            self._nextChar(offset - 1)
-        if self._hasChar() and self._getChar() == '\n':
-            self._line += 1
-            self._pos = 0
-        self._index += 1
-        self._pos += 1
+        self._index += offset
 
     def _parseNetText(self):
         if not self._hasChar():
@@ -146,23 +851,34 @@ class Netlist():
     def _parseNetItem(self, parent):
         if not self._hasChar():
             return None
-        if self._getChar() != '(':
-            self._error("Элемент должен начинаться символом '('!")
-        self._nextChar()
-        name = ""
-        while self._hasChar():
-            character = self._getChar()
-            if character in " ()\n":
-                break
-            name += character
-            self._nextChar()
-        else:
-            self._error("Элемент неожиданно закончился!")
-        if name == "":
-            self._error("Элемент не имеет имени!")
-        item = NetlistItem(parent, name)
-        isAttribute = True
-        while self._hasChar():
+        # Незаконченные родительские элементы (со своими признаками
+        # isAttribute) -- вложенность элементов не ограничена глубиной
+        # рекурсии.
+        stack = []
+        item = None
+        while True:
+            if item is None:
+                if self._getChar() != '(':
+                    self._error("Элемент должен начинаться символом '('!")
+                self._nextChar()
+                name = ""
+                while self._hasChar():
+                    character = self._getChar()
+                    if character in " ()\n":
+                        break
+                    name += character
+                    self._nextChar()
+                else:
+                    self._error("Элемент неожиданно закончился!")
+                if name == "":
+                    self._error("Элемент не имеет имени!")
+                item = NetlistItem(parent, name)
+                isAttribute = True
+            if not self._hasChar():
+                self._error(
+                    "Элемент неожиданно закончился " \
+                    "(должен заканчиваться символом ')')!"
+                )
             character = self._getChar()
             if character == ' ':
                 self._nextChar()
@@ -170,14 +886,19 @@ class Netlist():
                 isAttribute = False
                 self._nextChar()
             elif character == '(':
-                subitem = self._parseNetItem(item)
+                stack.append((item, isAttribute))
+                parent = item
+                item = None
+            elif character == ')':
+                self._nextChar()
+                if not stack:
+                    return item
+                subitem = item
+                item, isAttribute = stack.pop()
                 if isAttribute:
                     item.attributes[subitem.name] = subitem.text
                 else:
                     item.items.append(subitem)
-            elif character == ')':
-                self._nextChar()
-                break
             else:
                 text = self._parseNetText()
                 if item.text is not None:
@@ -186,12 +907,487 @@ class Netlist():
                         "(не может быть больше одного)!"
                     )
                 item.text = text
+
+    def _parseNetContent(self, sections=None, components=None):
+        """Разобрать список цепей в формате S-выражений по лексемам.
+
+        В отличие от _parseNetItem(), содержимое файла разбирается не
+        посимвольно, а целыми лексемами с помощью регулярного выражения.
+        Результат разбора и сообщения об ошибках совпадают с посимвольным
+        разбором.
+
+        Файл считывается частями с помощью _readNetChunk(), поэтому в памяти
+        одновременно находится только одна часть содержимого. Функция
+        является генератором: сначала возвращается корневой элемент (без
+        дочерних элементов), затем -- элементы верхнего уровня по мере
+        завершения их разбора.
+
+        Аргументы:
+        sections (frozenset of str) -- имена разделов, которые требуется
+            разобрать; остальные разделы пропускаются с помощью
+            _skipNetItem(). Если None -- разбираются все разделы;
+        components (list of ComponentRecord) -- если указан, то раздел
+            components не разбирается, а записи о компонентах извлекаются
+            из него с помощью _extractNetComponents() в этот массив.
+
+        """
+        if not self._readNetChunk():
+            return
+        content = self._content
+        if content[0] != '(':
+            self._errorAt(0, "Элемент должен начинаться символом '('!")
+        unquote = _unquoteNetText
+        item = None
+        isAttribute = True
+        # Родительские элементы и их признаки "атрибутности"
+        stack = []
+        token = None
+        position = 0
+        selective = sections is not None or components is not None
+        # Перебор лексем начинается заново с начала каждой следующей части
+        # содержимого, а также с позиции, следующей за пропущенным разделом.
+        while True:
+            for token in _NET_TOKENS.finditer(content, position):
+                kind = token.lastindex
+                if selective and kind <= 7 \
+                    and len(stack) == 1 and not isAttribute:
+                        # Начало раздела (элемента верхнего уровня)
+                        group = 1 if kind <= 6 else 7
+                        name = token.group(group)
+                        if components is not None and name == "components":
+                            position = self._extractNetComponents(
+                                token.start(group) - 1,
+                                components
+                            )
+                            content = self._content
+                            break
+                        if sections is not None and name not in sections:
+                            position = self._skipNetItem(token.start(group) - 1)
+                            content = self._content
+                            break
+                if kind <= 6:
+                    name, attributes, quoted, text, closings, newline = \
+                        token.group(1, 2, 3, 4, 5, 6)
+                    if not attributes:
+                        attributes = None
+                    if quoted is not None:
+                        text = unquote(quoted)
+                    if not closings:
+                        stack.append((item, isAttribute))
+                        item = NetlistItem(item, name, attributes, None, text)
+                        isAttribute = not newline
+                        if len(stack) == 1:
+                            yield item
+                        continue
+                    if item is None:
+                        yield NetlistItem(None, name, attributes, None, text)
+                        return
+                    if isAttribute:
+                        item.attributes[sys.intern(name)] = text
+                    elif len(stack) == 1:
+                        yield NetlistItem(item, name, attributes, None, text)
+                    else:
+                        item.items.append(
+                            NetlistItem(item, name, attributes, None, text)
+                        )
+                    closings = len(closings) - 1
+                elif kind == 7:
+                    name = token.group(7)
+                    index = token.end()
+                    if index == len(content):
+                        self._errorAt(index, "Элемент неожиданно закончился!")
+                    if not name:
+                        self._errorAt(index, "Элемент не имеет имени!")
+                    stack.append((item, isAttribute))
+                    item = NetlistItem(item, name)
+                    isAttribute = True
+                    if len(stack) == 1:
+                        yield item
+                    continue
+                elif kind == 8:
+                    closings = 1
+                    newline = None
+                elif kind == 9:
+                    isAttribute = False
+                    continue
+                elif kind == 12:
+                    end = content.find('\n', token.start())
+                    self._errorAt(
+                        len(content) if end == -1 else end,
+                        "Значение неожиданно закончилось " \
+                        "(должно заканчиваться символом '\"')!"
+                    )
+                else:
+                    text = token.group(kind)
+                    if kind == 10:
+                        text = unquote(text)
+                    elif token.end() == len(content):
+                        self._errorAt(token.end(), "Значение неожиданно закончилось!")
+                    if item.text is not None:
+                        self._errorAt(
+                            token.end(),
+                            "У элемента обнаружено второе значение " \
+                            "(не может быть больше одного)!"
+                        )
+                    item.text = text
+                    continue
+                while closings:
+                    closings -= 1
+                    parent, isAttribute = stack.pop()
+                    if parent is None:
+                        return
+                    if isAttribute:
+                        parent.attributes[item.name] = item.text
+                    elif len(stack) == 1:
+                        yield item
+                    else:
+                        parent.items.append(item)
+                    item = parent
+                if newline:
+                    isAttribute = False
+            else:
+                if not self._readNetChunk():
+                    break
+                content = self._content
+                position = 0
+        self._errorAtEnd(token)
+
+    def _errorAtEnd(self, token):
+        """Сообщить о том, что содержимое закончилось раньше элемента.
+
+        Аргументы:
+        token (Match) -- последняя лексема содержимого или None.
+
+        """
+        content = self._content
+        if token is not None and token.string is content \
+            and token.end() == len(content) \
+            and token.lastindex <= 6 and not token.group(5) \
+            and token.group(6) is None:
+                if token.group(4) is not None:
+                    self._errorAt(token.end(), "Значение неожиданно закончилось!")
+                if not token.group(2) and token.group(3) is None:
+                    self._errorAt(token.end(), "Элемент неожиданно закончился!")
+        self._errorAt(
+            len(content),
+            "Элемент неожиданно закончился " \
+            "(должен заканчиваться символом ')')!"
+        )
+
+    def _extractNetComponents(self, index, records):
+        """Извлечь записи о компонентах из раздела components.
+
+        Раздел разбирается по тем же лексемам, что и в _parseNetContent(),
+        но элементы списка цепей не создаются: нужные значения сразу
+        переносятся в записи о компонентах.
+
+        Аргументы:
+        index (int) -- позиция начала раздела (символа '(');
+        records (list of ComponentRecord) -- массив, в который добавляются
+            извлечённые записи.
+
+        Возвращаемое значение (int) -- позиция в текущей части содержимого
+        (раздел может занимать несколько частей), следующая за концом
+        раздела.
+
+        """
+        content = self._content
+        unquote = _unquoteNetText
+        parseAttributes = _parseNetAttributes
+        # Открытые элементы в виде [имя, атрибуты, значение, признак
+        # "атрибутности"]; первый -- сам раздел components.
+        stack = []
+        isAttribute = True
+        value = footprint = datasheet = description = None
+        fields = {}
+        token = None
+        position = index
+        while True:
+            for token in _NET_TOKENS.finditer(content, position):
+                kind = token.lastindex
+                if kind <= 6:
+                    name, attributes, quoted, text, closings, newline = \
+                        token.group(1, 2, 3, 4, 5, 6)
+                    if quoted is not None:
+                        text = unquote(quoted)
+                    item = [name, attributes, text, isAttribute]
+                    if not closings:
+                        stack.append(item)
+                        isAttribute = not newline
+                        continue
+                    closings = len(closings)
+                    end = token.start(5)
+                elif kind == 7:
+                    name = token.group(7)
+                    if token.end() == len(content):
+                        self._errorAt(token.end(), "Элемент неожиданно закончился!")
+                    if not name:
+                        self._errorAt(token.end(), "Элемент не имеет имени!")
+                    stack.append([name, None, None, isAttribute])
+                    isAttribute = True
+                    continue
+                elif kind == 8:
+                    item = stack.pop()
+                    closings = 1
+                    end = token.start(8)
+                    newline = None
+                elif kind == 9:
+                    isAttribute = False
+                    continue
+                elif kind == 12:
+                    end = content.find('\n', token.start())
+                    self._errorAt(
+                        len(content) if end == -1 else end,
+                        "Значение неожиданно закончилось " \
+                        "(должно заканчиваться символом '\"')!"
+                    )
+                else:
+                    text = token.group(kind)
+                    if kind == 10:
+                        text = unquote(text)
+                    elif token.end() == len(content):
+                        self._errorAt(token.end(), "Значение неожиданно закончилось!")
+                    if stack[-1][2] is not None:
+                        self._errorAt(
+                            token.end(),
+                            "У элемента обнаружено второе значение " \
+                            "(не может быть больше одного)!"
+                        )
+                    stack[-1][2] = text
+                    continue
+                # Закрытие элемента item и, возможно, его родителей
+                while True:
+                    if not stack:
+                        return end + 1
+                    depth = len(stack)
+                    parent = stack[-1]
+                    if item[3]:
+                        attributes = parent[1]
+                        if attributes is None or attributes.__class__ is str:
+                            parent[1] = attributes = parseAttributes(attributes or "")
+                        attributes[item[0]] = item[2]
+                    elif depth == 1:
+                        if item[0] == "comp":
+                            attributes = item[1]
+                            if attributes is None or attributes.__class__ is str:
+                                attributes = parseAttributes(attributes or "")
+                            records.append(ComponentRecord(
+                                attributes["ref"],
+                                value,
+                                footprint,
+                                datasheet,
+                                description,
+                                fields
+                            ))
+                            value = footprint = datasheet = description = None
+                            fields = {}
+                    elif depth == 2:
+                        if parent[0] == "comp":
+                            name = item[0]
+                            if name == "value":
+                                value = item[2]
+                            elif name == "footprint":
+                                footprint = item[2]
+                            elif name == "datasheet":
+                                datasheet = item[2]
+                            elif name == "libsource":
+                                attributes = item[1]
+                                if attributes is None or attributes.__class__ is str:
+                                    attributes = parseAttributes(attributes or "")
+                                if "description" in attributes:
+                                    description = attributes["description"]
+                    elif depth == 3:
+                        if parent[0] == "fields" and stack[1][0] == "comp":
+                            attributes = item[1]
+                            if attributes is None or attributes.__class__ is str:
+                                attributes = parseAttributes(attributes or "")
+                            fields[attributes["name"]] = item[2]
+                    isAttribute = item[3]
+                    closings -= 1
+                    if not closings:
+                        break
+                    end += 1
+                    item = stack.pop()
+                if newline:
+                    isAttribute = False
+            if not self._readNetChunk():
+                break
+            content = self._content
+            position = 0
+        self._errorAtEnd(token)
+
+    def _readNetChunk(self, keep=None):
+        """Считать следующую часть содержимого файла списка цепей (*.net).
+
+        Файл читается блоками по _NET_CHUNK_SIZE байт. Часть содержимого
+        состоит только из целых строк: незаконченная последняя строка блока
+        переносится в следующую часть. Поскольку ни одна лексема не
+        переходит на другую строку, каждая часть разбирается независимо.
+        Для каждой считанной части запоминаются номер её первой новой строки
+        и смещение этой строки в файле (см. _seekNetLine()).
+
+        Аргументы:
+        keep (int) -- позиция начала строки в текущей части: строки,
+            начиная с неё, переносятся в начало новой части.
+
+        Возвращаемое значение (bool) -- True, если считана новая часть
+        содержимого; False -- если файл закончился (текущая часть при этом
+        не меняется).
+
+        """
+        offset = self._fileOffset - len(self._carry)
+        blocks = [self._carry]
+        while True:
+            block = self._file.read(_NET_CHUNK_SIZE)
+            if not block:
+                data = b"".join(blocks)
+                end = len(data)
+                break
+            self._fileOffset += len(block)
+            blocks.append(block)
+            if b'\n' in block:
+                data = b"".join(blocks)
+                end = data.rfind(b'\n') + 1
+                break
+        if not end:
+            return False
+        self._carry = data[end:]
+        content = data[:end].decode("utf-8")
+        if '\r' in content:
+            content = content.replace("\r\n", "\n").replace("\r", "\n")
+        if keep is None:
+            self._lineBase += self._content.count('\n')
+            line = self._lineBase
+            self._content = content
         else:
-            self._error(
-                "Элемент неожиданно закончился " \
-                "(должен заканчиваться символом ')')!"
-            )
-        return item
+            self._lineBase += self._content.count('\n', 0, keep)
+            kept = self._content[keep:]
+            line = self._lineBase + kept.count('\n')
+            self._content = kept + content
+        if not self._checkpoints or offset > self._checkpoints[-1][1]:
+            self._checkpoints.append((line, offset))
+        return True
+
+    def _seekNetLine(self, line):
+        """Начать чтение содержимого файла заново с указанной строки.
+
+        Чтение начинается не с начала файла, а с ближайшей предшествующей
+        строки, для которой при чтении запомнено смещение в файле (в начале
+        одной из ранее считанных частей содержимого).
+
+        Аргументы:
+        line (int) -- номер строки (начиная с 0).
+
+        """
+        number = bisect.bisect_right(self._checkpoints, (line, float("inf"))) - 1
+        lineBase, offset = self._checkpoints[number]
+        self._file.seek(offset)
+        self._fileOffset = offset
+        self._carry = b""
+        self._content = ""
+        self._lineBase = lineBase
+        while self._readNetChunk():
+            if self._lineBase + self._content.count('\n') > line:
+                break
+        index = 0
+        for _ in range(line - self._lineBase):
+            index = self._content.find('\n', index) + 1
+        self._lineBase = line
+        self._content = self._content[index:]
+
+    def _skipNetItem(self, index):
+        """Пропустить элемент в формате S-выражений, не разбирая его.
+
+        KiCad записывает имя раздела на отдельной строке, его содержимое --
+        на следующих строках с большим отступом, а закрывающую скобку -- в
+        конце последней из этих строк. Поэтому конец элемента сначала
+        ищется по отступам и проверяется подсчётом скобок (без учёта
+        значений в кавычках). Если проверка не проходит, содержимое
+        элемента просматривается заново от начала элемента в поисках парной
+        закрывающей скобки: чтение файла возобновляется с начала части
+        содержимого, в которой находится начало элемента (см.
+        _seekNetLine()), а не с начала файла.
+
+        Аргументы:
+        index (int) -- позиция начала элемента (символа '(') в текущей
+            части содержимого.
+
+        Возвращаемое значение (int) -- позиция в текущей части содержимого
+        (элемент может занимать несколько частей), следующая за концом
+        элемента.
+
+        """
+        content = self._content
+        lineStart = content.rfind('\n', 0, index) + 1
+        indent = index - lineStart
+        # Положение начала элемента -- на случай повторного просмотра
+        startLine = self._lineBase + content.count('\n', 0, index)
+        nextLine = re.compile(r'\n {{0,{}}}[^ \n]'.format(indent))
+        # Баланс скобок в уже просмотренных строках элемента
+        balance = 0
+        firstLine = None
+        while True:
+            match = nextLine.search(content, index)
+            if match is not None:
+                end = match.start()
+                break
+            # Последняя строка части переносится в следующую часть, чтобы
+            # конец элемента всегда находился в одной части с ним.
+            keep = content.rfind('\n', 0, len(content) - 1) + 1
+            if keep <= index:
+                keep = content.rfind('\n', 0, index) + 1
+            passed = content[index:keep]
+            if not self._readNetChunk(keep):
+                end = len(content)
+                break
+            content = self._content
+            if passed:
+                text = _NET_QUOTED_TEXT.sub("", passed)
+                if firstLine is None:
+                    firstLine = text[:text.find('\n')]
+                balance += text.count('(') - text.count(')')
+                index = 0
+            else:
+                index -= keep
+        block = content[index:end].rstrip()
+        text = _NET_QUOTED_TEXT.sub("", block)
+        if firstLine is None and '\n' in text:
+            firstLine = text[:text.find('\n')]
+        # Закрывающие скобки родительских элементов в той же строке
+        extra = text.count(')') - text.count('(') - balance
+        if firstLine is not None and ')' not in firstLine \
+            and extra >= 0 and block.endswith(')' * (extra + 1)):
+                return index + len(block) - extra
+        self._seekNetLine(startLine)
+        content = self._content
+        index = indent
+        depth = 0
+        while True:
+            match = _NET_SKIP.match(content, index)
+            index = match.end()
+            character = match.group(1)
+            if character == '(':
+                depth += 1
+            elif character == ')':
+                depth -= 1
+                if not depth:
+                    return index
+            elif character == '"':
+                end = content.find('\n', index)
+                self._errorAt(
+                    len(content) if end == -1 else end,
+                    "Значение неожиданно закончилось " \
+                    "(должно заканчиваться символом '\"')!"
+                )
+            elif self._readNetChunk():
+                content = self._content
+                index = 0
+            else:
+                self._errorAt(
+                    len(content),
+                    "Элемент неожиданно закончился " \
+                    "(должен заканчиваться символом ')')!"
+                )
 
     @staticmethod
     def _formatNetText(text):
@@ -205,24 +1401,66 @@ class Netlist():
                 text = '"{}"'.format(text)
         return text
 
-    def _formatNetItem(self, item):
-        output = '(' + item.name
-        for attrName in item.attributes:
-            attrValue = item.attributes[attrName]
-            attrValue = self._formatNetText(attrValue)
-            output += " ({} {})".format(attrName, attrValue)
-        if item.items:
-            output += '\n'
-            for subitem in item.items:
-                childText = self._formatNetItem(subitem)
-                for line in childText.splitlines():
-                    output += "  {}\n".format(line)
-        if item.text is not None:
-            output += ' ' + self._formatNetText(item.text)
-        else:
-            output = output.rstrip('\n')
-        output += ')'
-        return output
+    @staticmethod
+    def _indentText(text, depth):
+        """Сдвинуть строки фрагмента текста на указанную глубину вложенности.
+
+        Каждая строка фрагмента (в том числе продолжение значения с
+        символами перевода строки) начинается с двух пробелов на каждый
+        уровень вложенности.
+
+        """
+        if not depth:
+            return text
+        indent = "  " * depth
+        return indent + ('\n' + indent).join(text.splitlines())
+
+    def _writeNetItem(self, item, netlist):
+        """Записать элемент в формате S-выражений в файл.
+
+        Элементы записываются по мере обхода дерева; хранятся только
+        итераторы по дочерним элементам открытых (незаконченных) элементов.
+
+        Аргументы:
+        item (NetlistItem) -- записываемый элемент;
+        netlist (file) -- текстовый файл, открытый для записи.
+
+        """
+        write = netlist.write
+        # Открытые элементы: итератор по оставшимся дочерним элементам,
+        # глубина вложенности и окончание элемента (со значением).
+        stack = []
+        depth = 0
+        while True:
+            head = '(' + item.name
+            if item._attributes:
+                for attrName, attrValue in item.attributes.items():
+                    attrValue = self._formatNetText(attrValue)
+                    head += " ({} {})".format(attrName, attrValue)
+            tail = ')'
+            if item.text is not None:
+                tail = ' ' + self._formatNetText(item.text) + tail
+            if item._items:
+                write(self._indentText(head, depth))
+                stack.append((iter(item._items), depth, tail, item.text is not None))
+            else:
+                write(self._indentText(head + tail, depth))
+            # Переход к следующему дочернему элементу открытого элемента
+            while stack:
+                children, depth, tail, hasText = stack[-1]
+                item = next(children, None)
+                if item is not None:
+                    write('\n')
+                    depth += 1
+                    break
+                stack.pop()
+                if hasText:
+                    write('\n')
+                    write(self._indentText(tail, depth))
+                else:
+                    write(tail)
+            else:
+                return
 
     def _parseXmlAttribute(self):
         if not self._hasChar():
@@ -263,98 +1501,457 @@ class Netlist():
     def _parseXmlItem(self, parent):
         if not self._hasChar():
             return None
-        if self._getChar() != '<':
-            self._error("Элемент должен начинаться символом '<'!")
-        self._nextChar()
-        name = ""
-        while self._hasChar():
-            character = self._getChar()
-            if character in "/> ":
-                break
-            name += character
+        # Незаконченные родительские элементы с их закрывающими тегами --
+        # вложенность элементов не ограничена глубиной рекурсии.
+        stack = []
+        while True:
+            if self._getChar() != '<':
+                self._error("Элемент должен начинаться символом '<'!")
             self._nextChar()
-        else:
-            self._error("Элемент неожиданно закончился!")
-        if name == "":
-            self._error("Элемент не имеет имени!")
-        item = NetlistItem(parent, name)
-        # Атрибуты
-        while self._hasChar():
-            character = self._getChar()
-            if character == ' ':
-                self._nextChar()
-            elif character == '>':
+            name = ""
+            while self._hasChar():
+                character = self._getChar()
+                if character in "/> ":
+                    break
+                name += character
                 self._nextChar()
-                break
-            elif character == '/':
-                if self._getChar(+1) != '>':
-                    self._error(
-                        "Недопустимая последовательность символов " \
-                        "(после '/' ожидался символ '>')!"
-                    )
-                self._nextChar(2)
-                return item
             else:
-                attrName, attrValue = self._parseXmlAttribute()
-                item.attributes[attrName] = attrValue
-        else:
-            self._error("Элемент неожиданно закончился!")
-        # Дочерние элементы
-        closingTag = "</{}>".format(name)
-        if self._getChar() == '\n':
-            self._nextChar()
+                self._error("Элемент неожиданно закончился!")
+            if name == "":
+                self._error("Элемент не имеет имени!")
+            item = NetlistItem(parent, name)
+            closed = False
+            # Атрибуты
             while self._hasChar():
                 character = self._getChar()
-                if character in " \n":
+                if character == ' ':
+                    self._nextChar()
+                elif character == '>':
                     self._nextChar()
-                elif self._content[self._index:].startswith(closingTag):
-                    self._nextChar(len(closingTag))
                     break
-                elif character == '<':
-                    subitem = self._parseXmlItem(item)
-                    item.items.append(subitem)
+                elif character == '/':
+                    if self._getChar(+1) != '>':
+                        self._error(
+                            "Недопустимая последовательность символов " \
+                            "(после '/' ожидался символ '>')!"
+                        )
+                    self._nextChar(2)
+                    closed = True
+                    break
                 else:
-                    self._error(
-                        "Обнаружен недопустимый символ '{}'!".format(character)
-                    )
+                    attrName, attrValue = self._parseXmlAttribute()
+                    item.attributes[sys.intern(attrName)] = attrValue
             else:
                 self._error("Элемент неожиданно закончился!")
-        # Значение
-        else:
-            text = ""
-            while self._hasChar():
-                character = self._getChar()
-                if self._content[self._index:].startswith(closingTag):
-                    self._nextChar(len(closingTag))
+            if not closed:
+                closingTag = "</{}>".format(name)
+                # Дочерние элементы
+                if self._getChar() == '\n':
+                    self._nextChar()
+                    stack.append((item, closingTag))
+                # Значение
+                else:
+                    text = ""
+                    while self._hasChar():
+                        character = self._getChar()
+                        if self._content.startswith(closingTag, self._index):
+                            self._nextChar(len(closingTag))
+                            break
+                        text += character
+                        self._nextChar()
+                    else:
+                        self._error("Элемент неожиданно закончился!")
+                    if text:
+                        item.text = html.unescape(text)
+                    closed = True
+            # Продолжение разбора дочерних элементов родителя
+            while True:
+                if closed:
+                    if not stack:
+                        return item
+                    stack[-1][0].items.append(item)
+                parent, closingTag = stack[-1]
+                closed = False
+                while self._hasChar():
+                    character = self._getChar()
+                    if character in " \n":
+                        self._nextChar()
+                    elif self._content.startswith(closingTag, self._index):
+                        self._nextChar(len(closingTag))
+                        closed = True
+                        break
+                    elif character == '<':
+                        break
+                    else:
+                        self._error(
+                            "Обнаружен недопустимый символ '{}'!".format(character)
+                        )
+                else:
+                    self._error("Элемент неожиданно закончился!")
+                if not closed:
                     break
-                text += character
-                self._nextChar()
+                item = stack.pop()[0]
+
+    def _parseXmlFile(self, netlist, sections=None, components=None):
+        """Разобрать список цепей в формате XML.
+
+        Файл читается блоками по _NET_CHUNK_SIZE байт и разбирается
+        потоковым парсером expat из стандартной библиотеки. Результат
+        разбора совпадает с результатом посимвольного разбора
+        _parseXmlItem(). Функция является генератором: сначала возвращается
+        корневой элемент (без дочерних элементов), затем -- элементы
+        верхнего уровня по мере завершения их разбора.
+
+        Аргументы:
+        netlist (file) -- файл списка цепей, открытый в двоичном режиме;
+        sections (frozenset of str) -- имена разделов, которые требуется
+            разобрать; остальные разделы пропускаются поиском закрывающего
+            тега и парсеру не передаются. Если None -- разбираются все
+            разделы;
+        components (list of ComponentRecord) -- если указан, то элементы
+            раздела components не создаются, а записи о компонентах
+            извлекаются из него в этот массив.
+
+        """
+        parser = expat.ParserCreate()
+        parser.buffer_text = True
+        # Открытые элементы: последний -- текущий разбираемый элемент
+        stack = [None]
+        # Фрагменты текста, следующие за последним открывающим тегом
+        texts = []
+        # Разобранные, но ещё не возвращённые элементы
+        ready = []
+
+        def startElement(name, attributes):
+            parent = stack[-1]
+            item = NetlistItem(parent, name, attributes or None)
+            if parent is None:
+                ready.append(item)
+            elif len(stack) > 2:
+                parent.items.append(item)
+            stack.append(item)
+            texts.clear()
+
+        def endElement(name):
+            item = stack.pop()
+            if texts:
+                if not item._items:
+                    text = "".join(texts)
+                    # Если сразу за открывающим тегом следует перевод строки,
+                    # то это отступ перед дочерними элементами, а не значение.
+                    if text[0] != '\n':
+                        item.text = text
+                texts.clear()
+            if len(stack) == 2:
+                ready.append(item)
+
+        parser.StartElementHandler = startElement
+        parser.EndElementHandler = endElement
+        parser.CharacterDataHandler = texts.append
+        try:
+            for _ in self._feedXmlFile(parser, netlist, sections, components):
+                if ready:
+                    yield from ready
+                    ready.clear()
+        except expat.ExpatError as error:
+            raise ParseException(
+                error.lineno,
+                error.offset + 1,
+                "Нарушена структура XML: {}!".format(
+                    expat.ErrorString(error.code)
+                )
+            )
+
+    def _feedXmlFile(self, parser, netlist, sections, components):
+        """Передать парсеру содержимое файла XML по частям.
+
+        Если требуются не все разделы, то конец каждого раздела определяется
+        по его закрывающему тегу (разделы списка цепей не содержат вложенных
+        элементов с тем же именем). Вместо пропущенного раздела парсеру
+        передаются переводы строк, чтобы номера строк в сообщениях об
+        ошибках соответствовали файлу. Функция является генератором и
+        возвращает управление после передачи парсеру очередного блока
+        файла или раздела.
+
+        Аргументы:
+        parser (xmlparser) -- парсер expat;
+        netlist (file) -- файл списка цепей, открытый в двоичном режиме;
+        sections (frozenset of str) -- имена разделов, которые требуется
+            разобрать (None -- все разделы);
+        components (list of ComponentRecord) -- массив для записей о
+            компонентах (None -- раздел components разбирается как
+            остальные).
+
+        """
+        # Прочитанная, но ещё не переданная парсеру часть файла находится в
+        # буфере data начиная с позиции pos. Буфер обрезается только при
+        # чтении следующего блока файла.
+        data = b""
+        pos = 0
+        if sections is not None or components is not None:
+            root = None
+            while root is None:
+                block = netlist.read(_NET_CHUNK_SIZE)
+                if not block:
+                    break
+                data += block
+                root = _XML_START_TAG.search(data)
+            if root is not None and data[root.end() - 2] != ord('/'):
+                pos = root.end()
+                parser.Parse(data[:pos], False)
+                yield
+                while True:
+                    section = _XML_SECTION.match(data, pos)
+                    if section is None or section.end() == len(data):
+                        if section is None and data[pos:].strip() not in (b"", b"<"):
+                            # За разделами следует закрывающий тег корневого
+                            # элемента или что-то неожиданное.
+                            break
+                        block = netlist.read(_NET_CHUNK_SIZE)
+                        if not block:
+                            break
+                        data = data[pos:] + block
+                        pos = 0
+                        continue
+                    start = section.start(1) - 1
+                    name = section.group(1).decode("utf-8")
+                    parser.Parse(data[pos:start], False)
+                    pos = start
+                    skip = False
+                    handlers = None
+                    if components is not None and name == "components":
+                        handlers = (
+                            parser.StartElementHandler,
+                            parser.EndElementHandler,
+                            parser.CharacterDataHandler
+                        )
+                        parser.StartElementHandler, \
+                        parser.EndElementHandler, \
+                        parser.CharacterDataHandler = \
+                            self._getXmlComponentHandlers(components)
+                    elif sections is not None and name not in sections:
+                        skip = True
+                    # Конец открывающего тега
+                    end = data.find(b'>', pos) + 1
+                    while not end:
+                        block = netlist.read(_NET_CHUNK_SIZE)
+                        if not block:
+                            break
+                        searched = len(data) - pos
+                        data = data[pos:] + block
+                        pos = 0
+                        end = data.find(b'>', searched) + 1
+                    if end and data[end - 2] != ord('/'):
+                        # Закрывающий тег ищется только в ещё не
+                        # просмотренной части буфера; просмотренное
+                        # содержимое передаётся парсеру (или пропускается)
+                        # перед чтением следующего блока файла.
+                        closingTag = b'</' + section.group(1) + b'>'
+                        found = data.find(closingTag, end)
+                        while found == -1:
+                            cut = max(end, len(data) - len(closingTag) + 1)
+                            if skip:
+                                parser.Parse(b'\n' * data.count(b'\n', pos, cut), False)
+                            else:
+                                parser.Parse(data[pos:cut], False)
+                            pos = cut
+                            block = netlist.read(_NET_CHUNK_SIZE)
+                            if not block:
+                                break
+                            data = data[pos:] + block
+                            pos = 0
+                            end = 0
+                            found = data.find(closingTag)
+                        end = found + len(closingTag) if found != -1 else 0
+                    if not end:
+                        # Файл закончился раньше раздела
+                        break
+                    if skip:
+                        parser.Parse(b'\n' * data.count(b'\n', pos, end), False)
+                    else:
+                        parser.Parse(data[pos:end], False)
+                    pos = end
+                    if handlers is not None:
+                        parser.StartElementHandler, \
+                        parser.EndElementHandler, \
+                        parser.CharacterDataHandler = handlers
+                    yield
+            data = data[pos:]
+        while True:
+            parser.Parse(data, False)
+            yield
+            data = netlist.read(_NET_CHUNK_SIZE)
+            if not data:
+                break
+        parser.Parse(b"", True)
+        yield
+
+    @staticmethod
+    def _getXmlComponentHandlers(records):
+        """Вернуть обработчики expat, извлекающие записи о компонентах.
+
+        Обработчики предназначены для разбора раздела components (от
+        открывающего до закрывающего тега раздела) и не создают элементы
+        списка цепей. Значения определяются так же, как в _parseXmlFile().
+
+        Аргументы:
+        records (list of ComponentRecord) -- массив, в который добавляются
+            извлечённые записи.
+
+        Возвращаемое значение (tuple) -- обработчики начала элемента, конца
+        элемента и текста.
+
+        """
+        # Открытые элементы в виде [имя, атрибуты, признак наличия дочерних
+        # элементов]; первый -- сам раздел components.
+        stack = []
+        texts = []
+        # Значения текущего компонента
+        values = {}
+        fields = {}
+
+        def startElement(name, attributes):
+            if stack:
+                stack[-1][2] = True
+            stack.append([name, attributes, False])
+            texts.clear()
+
+        def endElement(name):
+            nonlocal fields
+            name, attributes, hasItems = stack.pop()
+            text = None
+            if texts:
+                if not hasItems:
+                    text = "".join(texts)
+                    if text[0] == '\n':
+                        text = None
+                texts.clear()
+            depth = len(stack)
+            if depth == 1:
+                if name == "comp":
+                    records.append(ComponentRecord(
+                        attributes["ref"],
+                        values.get("value"),
+                        values.get("footprint"),
+                        values.get("datasheet"),
+                        values.get("description"),
+                        fields
+                    ))
+                    values.clear()
+                    fields = {}
+            elif depth == 2:
+                if stack[1][0] == "comp":
+                    if name in ("value", "footprint", "datasheet"):
+                        values[name] = text
+                    elif name == "libsource":
+                        if "description" in attributes:
+                            values["description"] = attributes["description"]
+            elif depth == 3:
+                if stack[2][0] == "fields" and stack[1][0] == "comp":
+                    fields[attributes["name"]] = text
+
+        return startElement, endElement, texts.append
+
+    def _writeXmlItem(self, item, netlist):
+        """Записать элемент в формате XML в файл.
+
+        Элементы записываются по мере обхода дерева; хранятся только
+        итераторы по дочерним элементам открытых (незаконченных) элементов.
+
+        Аргументы:
+        item (NetlistItem) -- записываемый элемент;
+        netlist (file) -- текстовый файл, открытый для записи.
+
+        """
+        write = netlist.write
+        # Открытые элементы: итератор по оставшимся дочерним элементам,
+        # глубина вложенности и окончание элемента (со значением).
+        stack = []
+        depth = 0
+        while True:
+            head = '<' + item.name
+            if item._attributes:
+                for attrName, attrValue in item.attributes.items():
+                    attrValue = html.escape(attrValue)
+                    head += ' {}="{}"'.format(attrName, attrValue)
+            tail = "</{}>".format(item.name)
+            if item.text:
+                tail = html.escape(item.text, quote=False) + tail
+            if item._items:
+                write(self._indentText(head + '>', depth))
+                stack.append((iter(item._items), depth, tail))
+            elif item.text:
+                write(self._indentText(head + '>' + tail, depth))
             else:
-                self._error("Элемент неожиданно закончился!")
-            if text:
-                item.text = text
-        return item
-
-    def _formatXmlItem(self, item):
-        output = '<' + item.name
-        for attrName in item.attributes:
-            attrValue = item.attributes[attrName]
-            attrValue = html.escape(attrValue)
-            output += ' {}="{}"'.format(attrName, attrValue)
-        if not item.text and not item.items:
-            output += "/>"
-            return output
-        output += '>'
-        if item.items:
-            output += '\n'
-            for subitem in item.items:
-                childText = self._formatXmlItem(subitem)
-                for line in childText.splitlines():
-                    output += "  {}\n".format(line)
-        if item.text:
-            output += item.text
-        output += "</{}>".format(item.name)
-        return output
+                write(self._indentText(head + "/>", depth))
+            # Переход к следующему дочернему элементу открытого элемента
+            while stack:
+                children, depth, tail = stack[-1]
+                item = next(children, None)
+                write('\n')
+                if item is not None:
+                    depth += 1
+                    break
+                stack.pop()
+                write(self._indentText(tail, depth))
+            else:
+                return
+
+    def _getNameIndex(self):
+        """Вернуть индекс элементов списка цепей по именам.
+
+        Индекс строится при первом обращении к нему одним обходом дерева.
+        Элементы нумеруются в порядке обхода (в порядке следования в файле),
+        поэтому элементы любого поддерева занимают непрерывный диапазон
+        номеров.
+
+        Возвращаемое значение (tuple) -- корневой элемент, для которого
+        построен индекс; словарь {имя: (элементы, номера, номера предков)},
+        где номер предка -- номер ближайшего родительского элемента с тем же
+        именем или -1; словарь {элемент: (номер, номер элемента, следующего
+        за поддеревом)} для элементов, имеющих дочерние элементы.
+
+        """
+        if self._nameIndex is not None and self._nameIndex[0] is self.data:
+            return self._nameIndex
+        names = {}
+        ranges = {}
+        # Номера ближайших открытых элементов с каждым из имён
+        nearest = {}
+        number = 0
+        stack = [self.data]
+        while stack:
+            item = stack.pop()
+            if item.__class__ is tuple:
+                # Конец поддерева элемента
+                item, name, ancestor, start = item
+                nearest[name] = ancestor
+                ranges[item] = (start, number)
+                continue
+            name = item.name
+            entry = names.get(name)
+            if entry is None:
+                entry = names[name] = ([], array.array('i'), array.array('i'))
+            ancestor = nearest.get(name, -1)
+            entry[0].append(item)
+            entry[1].append(number)
+            entry[2].append(ancestor)
+            if item._items:
+                stack.append((item, name, ancestor, number))
+                nearest[name] = number
+                stack.extend(reversed(item._items))
+            number += 1
+        self._nameIndex = (self.data, names, ranges)
+        return self._nameIndex
+
+    def resetIndex(self):
+        """Сбросить индекс элементов по именам.
+
+        Необходимо вызвать после изменения дерева элементов (data), чтобы
+        find() и items() учитывали изменения.
+
+        """
+        self._nameIndex = None
 
     def find(self, name, item=None):
         """Найти элемент списка цепей с указанным именем.
@@ -362,19 +1959,38 @@ class Netlist():
         Будет возвращён первый найденный элемент с указанным именем (порядок
         элементов соответствует тому, который имеется в файле списка цепей).
         Если элемент найти не удастся -- будет возвращено значение None.
+        Поиск выполняется по индексу элементов (см. resetIndex()).
 
         Аргументы:
-        name (str) -- имя элемента.
+        name (str) -- имя элемента;
+        item (NetlistItem) -- элемент, среди которого и его дочерних
+            элементов выполняется поиск (по умолчанию -- корневой).
 
         """
         if item is None:
             item = self.data
         if item.name == name:
             return item
-        for subitem in item.items:
-            foundItem = self.find(name, subitem)
-            if foundItem is not None:
-                return foundItem
+        if not item._items:
+            return None
+        _, names, ranges = self._getNameIndex()
+        span = ranges.get(item)
+        if span is None:
+            # Элемент не входит в дерево, для которого построен индекс.
+            stack = [item]
+            while stack:
+                item = stack.pop()
+                if item.name == name:
+                    return item
+                stack.extend(reversed(item._items))
+            return None
+        entry = names.get(name)
+        if entry is None:
+            return None
+        found, numbers, _ = entry
+        index = bisect.bisect_left(numbers, span[0])
+        if index < len(numbers) and numbers[index] < span[1]:
+            return found[index]
         return None
 
     def items(self, name, item=None):
@@ -382,33 +1998,62 @@ class Netlist():
 
         Будет возвращён итератор, возвращающий элементы с указанным именем
         (порядок элементов соответствует тому, который имеется в файле списка
-        цепей).
+        цепей). Элементы, вложенные в найденные, не возвращаются. Поиск
+        выполняется по индексу элементов (см. resetIndex()).
 
         Аргументы:
-        name (str) -- имя элемента.
+        name (str) -- имя элемента;
+        item (NetlistItem) -- элемент, среди которого и его дочерних
+            элементов выполняется поиск (по умолчанию -- корневой).
 
         """
         if item is None:
             item = self.data
         if item.name == name:
             yield item
-        else:
-            for subitem in item.items:
-                for nextItem in self.items(name, subitem):
-                    yield nextItem
+            return
+        if not item._items:
+            return
+        _, names, ranges = self._getNameIndex()
+        span = ranges.get(item)
+        if span is None:
+            # Элемент не входит в дерево, для которого построен индекс.
+            stack = [item]
+            while stack:
+                item = stack.pop()
+                if item.name == name:
+                    yield item
+                else:
+                    stack.extend(reversed(item._items))
+            return
+        entry = names.get(name)
+        if entry is None:
+            return
+        found, numbers, ancestors = entry
+        start, end = span
+        low = bisect.bisect_left(numbers, start)
+        high = bisect.bisect_left(numbers, end, low)
+        for index in range(low, high):
+            # Элементы, вложенные в элементы с тем же именем внутри
+            # поддерева, пропускаются.
+            if ancestors[index] < start:
+                yield found[index]
 
     def save(self, fileName=None):
         """Записать данные списка цепей в файл.
 
         Аргументы:
-        fileName (str) -- имя файла для записи.
+        fileName (str) -- имя файла для записи (если имя заканчивается
+            расширением сжатого файла, например: *.net.gz -- файл будет
+            сжат).
 
         """
         if fileName is None:
             fileName = self.fileName
-        with open(fileName, 'w', encoding='utf-8') as netlist:
-            if fileName.endswith(".net"):
-                netlist.write(self._formatNetItem(self.data))
+        baseName, opener = _splitCompression(fileName)
+        with opener(fileName, 'wt', encoding='utf-8') as netlist:
+            if baseName.endswith(".net"):
+                self._writeNetItem(self.data, netlist)
             else:
                 netlist.write('<?xml version="1.0" encoding="UTF-8"?>\n')
-                netlist.write(self._formatXmlItem(self.data))
+                self._writeXmlItem(self.data, netlist)
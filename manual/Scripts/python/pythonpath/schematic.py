@@ -3,10 +3,13 @@
 import sys
 
 kicadnet = None
+config = None
 
 def init(scriptcontext):
     global kicadnet
+    global config
     kicadnet = sys.modules["kicadnet" + scriptcontext.getDocument().RuntimeUID]
+    config = sys.modules["config" + scriptcontext.getDocument().RuntimeUID]
 
 
 class Schematic():
@@ -21,7 +24,14 @@ class Schematic():
         self.inspector = ""
         self.approver = ""
 
-        netlist = kicadnet.Netlist(netlistName)
+        cache = None
+        if config.getboolean("settings", "netlist cache"):
+            cache = kicadnet.NetlistCache()
+        netlist = kicadnet.Netlist(
+            netlistName,
+            sections=("design",),
+            cache=cache
+        )
         for sheet in netlist.items("sheet"):
             if sheet.attributes["name"] == "/":
                 title_block = netlist.find("title_block", sheet)
@@ -161,7 +161,8 @@ def setup(*args):
 файл списка цепей KiCad.
 Поддерживаются файлы с расширением
 *.net (Pcbnew) и с расширением
-*.xml (вспомогательный)."""
+*.xml (вспомогательный), в том числе
+сжатые (*.gz, *.xz)."""
     pageModel0.insertByName("Label00", labelModel00)
 
     buttonModel00 = pageModel0.createInstance(
@@ -186,6 +187,26 @@ def setup(*args):
     editControlModel00.Text = config.get("doc", "source")
     pageModel0.insertByName("EditControl00", editControlModel00)
 
+    checkModel00 = pageModel0.createInstance(
+        "com.sun.star.awt.UnoControlCheckBoxModel"
+    )
+    checkModel00.Width = tabsModel.Width - 7
+    checkModel00.Height = 15
+    checkModel00.PositionX = 2
+    checkModel00.PositionY = \
+        editControlModel00.PositionY + editControlModel00.Height + 5
+    checkModel00.Name = "CheckBox00"
+    checkModel00.State = \
+        {False: 0, True: 1}[config.getboolean("settings", "netlist cache")]
+    checkModel00.Label = "Сохранять результаты разбора списка цепей"
+    checkModel00.HelpText = """\
+Если отмечено, то результаты разбора
+файла списка цепей сохраняются в
+каталоге кэша пользователя и при
+повторном заполнении основной надписи
+файл не разбирается, если он не изменился."""
+    pageModel0.insertByName("CheckBox00", checkModel00)
+
     # ------------------------------------------------------------------------
     # Stamp Tab Model
     # ------------------------------------------------------------------------
@@ -353,6 +374,9 @@ class ButtonOKActionListener(unohelper.Base, XActionListener):
         config.set("doc", "source",
             page0.getControl("EditControl00").Text
         )
+        config.set("settings", "netlist cache",
+            {0: "no", 1: "yes"}[page0.getControl("CheckBox00").State]
+        )
 
         # --------------------------------------------------------------------
         # Основная надпись
@@ -387,7 +411,7 @@ class Button00ActionListener(unohelper.Base, XActionListener):
         editControl = self.dialog.getControl("Tabs").getControl("Page0").getControl("EditControl00")
         source = common.showFilePicker(
             editControl.Text,
-            **{"Список цепей KiCad": "*.net;*.xml", "Все файлы": "*.*"}
+            **{"Список цепей KiCad": "*.net;*.xml;*.net.gz;*.xml.gz;*.net.xz;*.xml.xz", "Все файлы": "*.*"}
         )
         if source is not None:
             editControl.Text = source
@@ -0,0 +1,246 @@
+#! /usr/bin/python
+"""Генератор списков цепей KiCad для проверки скорости разбора.
+
+Использование:
+
+    python netgen.py [параметры] список_цепей.net [список_цепей.xml]
+
+Создаётся список цепей в формате S-выражений (*.net) со структурой,
+которую формирует KiCad 5: разделы design (листы схемы с основными
+надписями), components, libparts, libraries и nets. Если указано второе
+имя файла -- тот же список цепей записывается в формате XML. Содержимое
+определяется начальным значением генератора случайных чисел, поэтому при
+одинаковых параметрах файлы получаются одинаковыми.
+
+Параметры:
+
+    -c N  количество компонентов (по умолчанию 1000);
+    -f N  количество дополнительных полей компонента (по умолчанию 4);
+    -n N  количество цепей (по умолчанию -- равно количеству компонентов);
+    -s N  количество листов схемы (по умолчанию 1);
+    -a    только символы ASCII (без кириллицы в значениях и именах полей);
+    -q    без значений, содержащих кавычки и обратную косую черту;
+    -r N  начальное значение генератора случайных чисел (по умолчанию 1).
+
+"""
+
+import getopt
+import os
+import random
+import sys
+
+sys.path.insert(
+    0,
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "index", "Scripts", "python", "pythonpath")
+)
+import kicadnet
+
+# Типы компонентов: буквенный код, библиотека, имя в библиотеке, описание
+# и возможные значения.
+COMPONENT_TYPES = (
+    ("R", "Device", "R", "Resistor", ("10k", "4k7", "100", "0R", "1M", "10 кОм")),
+    ("C", "Device", "C", "Unpolarized capacitor", ("100n", "10u", "22p", "1 мкФ")),
+    ("L", "Device", "L", "Inductor", ("10u", "4u7", "100 мкГн")),
+    ("VD", "Diode", "1N4148", "Small signal diode", ("1N4148", "BAV99", "КД522Б")),
+    ("VT", "Transistor_BJT", "BC847", "NPN transistor", ("BC847", "BC857", "КТ315Б")),
+    ("DA", "Amplifier_Operational", "LM358", "Dual operational amplifier", ("LM358", "LM324")),
+    ("XS", "Connector", "Conn_01x04", "Generic connector", ("PLS-4", "Разъём \"папа\"")),
+)
+
+# Имена дополнительных полей компонентов.
+FIELD_NAMES = ("Тип", "Документ", "Производитель", "Примечание", "Поставщик", "Класс точности")
+
+# Значения дополнительных полей компонентов.
+FIELD_VALUES = (
+    "Резистор {Резисторы}",
+    "ОЖ0.467.180 ТУ",
+    "ООО \"Компонент\"",
+    "Подбирают при регулировании",
+    "C:\\Документы\\данные.pdf",
+    "±5 %",
+    "SMD (0805)",
+)
+
+# Замена символов, не входящих в ASCII (для списков цепей без кириллицы).
+ASCII_TABLE = str.maketrans({
+    **dict(zip(
+        "абвгдеёжзийклмнопрстуфхцчшщъыьэюя",
+        ("a", "b", "v", "g", "d", "e", "e", "zh", "z", "i", "j", "k", "l",
+         "m", "n", "o", "p", "r", "s", "t", "u", "f", "h", "c", "ch", "sh",
+         "shh", "", "y", "", "e", "yu", "ya")
+    )),
+    **dict(zip(
+        "АБВГДЕЁЖЗИЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯ",
+        ("A", "B", "V", "G", "D", "E", "E", "Zh", "Z", "I", "J", "K", "L",
+         "M", "N", "O", "P", "R", "S", "T", "U", "F", "H", "C", "Ch", "Sh",
+         "Shh", "", "Y", "", "E", "Yu", "Ya")
+    )),
+    "±": "+-",
+})
+
+
+def quote(text):
+    """Вернуть значение в формате S-выражений (в кавычках, если нужно)."""
+    if text == "" or any(character in text for character in ' ()"\\\t\n'):
+        return '"' + text.replace('\\', '\\\\').replace('"', '\\"') + '"'
+    return text
+
+def transliterate(text, plain):
+    """Заменить значение, содержащее не только символы ASCII, если нужно."""
+    if plain:
+        return text.translate(ASCII_TABLE)
+    return text
+
+def generateNetlist(fileName, components=1000, fields=4, nets=None, sheets=1,
+                    plain=False, quotes=True, seed=1):
+    """Создать файл списка цепей в формате S-выражений.
+
+    Аргументы:
+    fileName (str) -- имя создаваемого файла (*.net);
+    components (int) -- количество компонентов;
+    fields (int) -- количество дополнительных полей компонента;
+    nets (int) -- количество цепей (None -- равно количеству компонентов);
+    sheets (int) -- количество листов схемы;
+    plain (bool) -- использовать только символы ASCII;
+    quotes (bool) -- добавлять значения с кавычками и обратной косой чертой;
+    seed (int) -- начальное значение генератора случайных чисел.
+
+    """
+    generator = random.Random(seed)
+    if nets is None:
+        nets = components
+    sheets = max(sheets, 1)
+    fieldNames = [
+        transliterate(FIELD_NAMES[index % len(FIELD_NAMES)], plain)
+        + (str(index // len(FIELD_NAMES) + 1) if index >= len(FIELD_NAMES) else "")
+        for index in range(fields)
+    ]
+    fieldValues = [transliterate(value, plain) for value in FIELD_VALUES]
+    if not quotes:
+        fieldValues = [
+            value for value in fieldValues if '"' not in value and '\\' not in value
+        ]
+    sheetNames = ["/"]
+    sheetStamps = ["/"]
+    for number in range(2, sheets + 1):
+        sheetNames.append("/{}{}/".format(transliterate("Лист", plain), number))
+        sheetStamps.append("/5E{:06X}/".format(number))
+    company = transliterate("ООО Предприятие", plain)
+    if quotes:
+        company = company.replace(" ", " \"", 1) + "\""
+    documentCode = transliterate("АБВГ", plain)
+    with open(fileName, "w", encoding="utf-8") as netlist:
+        write = netlist.write
+        write("(export (version D)\n")
+        write("  (design\n")
+        write("    (source {})\n".format(quote("/home/user/project/project.sch")))
+        write("    (date {})\n".format(quote(transliterate("Ср 11 мар 2020 12:00:00", plain))))
+        write("    (tool \"Eeschema (5.1.5)\")")
+        for number in range(sheets):
+            title = transliterate("Блок питания" if number else "Устройство", plain)
+            if quotes:
+                title += " \"{}\"".format(number + 1)
+            write("\n    (sheet (number {}) (name {}) (tstamps {})\n".format(
+                number + 1, quote(sheetNames[number]), sheetStamps[number]
+            ))
+            write("      (title_block\n")
+            write("        (title {})\n".format(quote(title)))
+            write("        (company {})\n".format(quote(company)))
+            write("        (rev)\n")
+            write("        (date)\n")
+            write("        (source {})\n".format(quote("sheet{}.sch".format(number + 1))))
+            write("        (comment (number 1) (value {}.123456.{:03}))\n".format(
+                documentCode, number + 1
+            ))
+            write("        (comment (number 2) (value {}))\n".format(quote(transliterate("Иванов И.И.", plain))))
+            write("        (comment (number 3) (value \"\"))\n")
+            write("        (comment (number 4) (value \"\"))))")
+        write(")\n  (components")
+        counters = {}
+        references = []
+        usedTypes = {}
+        for index in range(components):
+            prefix, library, part, description, values = generator.choice(COMPONENT_TYPES)
+            counters[prefix] = counters.get(prefix, 0) + 1
+            reference = "{}{}".format(prefix, counters[prefix])
+            references.append((reference, 2 if prefix in ("R", "C", "L", "VD") else 4))
+            usedTypes[(library, part)] = description
+            value = transliterate(generator.choice(values), plain)
+            if not quotes:
+                value = value.replace('"', '')
+            sheet = generator.randrange(sheets)
+            write("\n    (comp (ref {})\n".format(reference))
+            write("      (value {})\n".format(quote(value)))
+            write("      (footprint {})\n".format(quote("{}_SMD:{}_0805".format(library, part))))
+            write("      (datasheet ~)")
+            if fieldNames:
+                write("\n      (fields")
+                for fieldName in fieldNames:
+                    write("\n        (field (name {}) {})".format(
+                        quote(fieldName), quote(generator.choice(fieldValues))
+                    ))
+                write(")")
+            write("\n      (libsource (lib {}) (part {}) (description {}))\n".format(
+                library, part, quote(description)
+            ))
+            write("      (sheetpath (names {}) (tstamps {}))\n".format(
+                quote(sheetNames[sheet]), sheetStamps[sheet]
+            ))
+            write("      (tstamp 5F{:06X}))".format(index))
+        write(")\n  (libparts")
+        for (library, part), description in sorted(usedTypes.items()):
+            write("\n    (libpart (lib {}) (part {})\n".format(library, part))
+            write("      (description {})\n".format(quote(description)))
+            write("      (fields\n")
+            write("        (field (name Reference) {})\n".format(part[0]))
+            write("        (field (name Value) {}))\n".format(part))
+            write("      (pins\n")
+            write("        (pin (num 1) (name ~) (type passive))\n")
+            write("        (pin (num 2) (name ~) (type passive))))")
+        write(")\n  (libraries")
+        for library in sorted({library for library, _ in usedTypes}):
+            write("\n    (library (logical {})\n".format(library))
+            write("      (uri {}))".format(quote("/usr/share/kicad/library/{}.lib".format(library))))
+        write(")\n  (nets")
+        for code in range(1, nets + 1):
+            nodes = generator.sample(references, min(len(references), generator.randint(2, 4)))
+            if nodes:
+                name = "Net-({}-Pad{})".format(nodes[0][0], generator.randint(1, nodes[0][1]))
+            else:
+                name = "GND"
+            write("\n    (net (code {}) (name {})".format(code, quote(name)))
+            for reference, pins in nodes:
+                write("\n      (node (ref {}) (pin {}))".format(reference, generator.randint(1, pins)))
+            write(")")
+        write("))\n")
+
+def convertNetlist(netName, xmlName):
+    """Записать список цепей из файла *.net в файл *.xml."""
+    kicadnet.Netlist(netName).save(xmlName)
+
+def main():
+    try:
+        options, arguments = getopt.gnu_getopt(sys.argv[1:], "c:f:n:s:aqr:")
+    except getopt.GetoptError as error:
+        print(error)
+        print(__doc__)
+        return 1
+    if not 1 <= len(arguments) <= 2:
+        print(__doc__)
+        return 1
+    parameters = {}
+    names = {"-c": "components", "-f": "fields", "-n": "nets", "-s": "sheets", "-r": "seed"}
+    for option, value in options:
+        if option == "-a":
+            parameters["plain"] = True
+        elif option == "-q":
+            parameters["quotes"] = False
+        else:
+            parameters[names[option]] = int(value)
+    generateNetlist(arguments[0], **parameters)
+    if len(arguments) == 2:
+        convertNetlist(arguments[0], arguments[1])
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
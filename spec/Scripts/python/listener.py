@@ -7,6 +7,7 @@ import zipimport
 EMBEDDED_MODULES = (
     "textwidth",
     "kicadnet",
+    "kicadsch",
     "config",
     "schematic",
     "common",